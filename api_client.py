@@ -0,0 +1,132 @@
+# api_client.py
+
+import os
+import re
+import threading
+import time
+from collections import OrderedDict, defaultdict, deque
+
+import numpy as np
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+API = os.environ.get("API_URL", "http://localhost:8000")
+
+TIMEOUT = (3.05, 10)    # connect, read (seconds): a slow backend fails the callback instead of hanging it
+DEFAULT_TTL = 5.0       # seconds a GET response is reused by other callbacks
+MAX_ENTRIES = 256
+POOL_SIZE = 32
+
+# One keep-alive connection pool for every callback thread. Only GETs are retried:
+# they are idempotent, POSTs are not.
+_session = requests.Session()
+_session.mount("http://", HTTPAdapter(pool_connections=4, pool_maxsize=POOL_SIZE, max_retries=Retry(
+    total=2, backoff_factor=0.2, status_forcelist=[502, 503, 504], allowed_methods=["GET"])))
+_session.mount("https://", _session.get_adapter("http://"))
+
+_cache = OrderedDict()              # url -> (expires_at, data)
+_cache_lock = threading.Lock()
+# Striped so per-patient URLs don't grow a lock each
+_fetch_locks = [threading.Lock() for _ in range(64)]
+
+_stats_lock = threading.Lock()
+_counts = defaultdict(int)
+_latencies = defaultdict(lambda: deque(maxlen=1000))
+
+def _record(path, seconds, error=False):
+    path = re.sub(r"/\d+", "/{id}", path)  # one latency series per endpoint, not per patient
+    with _stats_lock:
+        _counts["requests"] += 1
+        if error:
+            _counts["errors"] += 1
+        _latencies[path].append(seconds)
+
+def _cached(url):
+    with _cache_lock:
+        entry = _cache.get(url)
+        if entry is not None and entry[0] > time.monotonic():
+            _cache.move_to_end(url)
+            return entry
+        return None
+
+def get(path, params=None, ttl=DEFAULT_TTL):
+    """GET {API}{path} and return the decoded JSON.
+
+    Responses are shared for ttl seconds across all callbacks (treat them as
+    read-only); ttl=0 always goes to the backend. Callbacks asking for the same
+    URL at the same time wait for one request instead of each sending their own.
+    Raises requests exceptions on timeouts and HTTP errors.
+    """
+    url = requests.Request("GET", f"{API}{path}", params=params).prepare().url
+    if ttl:
+        entry = _cached(url)
+        if entry is not None:
+            with _stats_lock:
+                _counts["hits"] += 1
+            return entry[1]
+
+    with _fetch_locks[hash(url) % len(_fetch_locks)]:
+        if ttl:
+            entry = _cached(url)
+            if entry is not None:
+                # Another callback fetched it while we waited
+                with _stats_lock:
+                    _counts["coalesced"] += 1
+                return entry[1]
+        with _stats_lock:
+            _counts["misses"] += 1
+
+        started = time.perf_counter()
+        try:
+            response = _session.get(url, timeout=TIMEOUT)
+            response.raise_for_status()
+            data = response.json()
+        except Exception:
+            _record(path, time.perf_counter() - started, error=True)
+            raise
+        _record(path, time.perf_counter() - started)
+
+        # Stored before the fetch lock is released, so callbacks waiting on it find the entry
+        if ttl:
+            with _cache_lock:
+                _cache[url] = (time.monotonic() + ttl, data)
+                _cache.move_to_end(url)
+                while len(_cache) > MAX_ENTRIES:
+                    _cache.popitem(last=False)
+    return data
+
+def post(path, payload):
+    """POST JSON to {API}{path}; returns the response. Clears the GET cache, since the data changed."""
+    started = time.perf_counter()
+    try:
+        response = _session.post(f"{API}{path}", json=payload, timeout=TIMEOUT)
+    except Exception:
+        _record(path, time.perf_counter() - started, error=True)
+        raise
+    _record(path, time.perf_counter() - started, error=not response.ok)
+    invalidate()
+    return response
+
+def invalidate():
+    with _cache_lock:
+        _cache.clear()
+
+def stats():
+    """Cache hit/miss counts and per-endpoint latency percentiles (ms) for this process."""
+    with _stats_lock:
+        counts = dict(_counts)
+        latencies = {path: np.asarray(values) * 1000 for path, values in _latencies.items()}
+    lookups = counts.get("hits", 0) + counts.get("coalesced", 0) + counts.get("misses", 0)
+    return {
+        **{key: counts.get(key, 0) for key in ("requests", "errors", "hits", "coalesced", "misses")},
+        "hit_rate": round((lookups - counts.get("misses", 0)) / lookups, 3) if lookups else None,
+        "endpoints": {
+            path: {
+                "count": len(ms),
+                "p50_ms": round(float(np.percentile(ms, 50)), 2),
+                "p95_ms": round(float(np.percentile(ms, 95)), 2),
+            }
+            for path, ms in sorted(latencies.items())
+        },
+    }
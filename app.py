@@ -1,14 +1,14 @@
 # app.py
 
+import importlib
+
 import dash
 from dash import dcc, html, Input, Output, State
 import dash_bootstrap_components as dbc
 import flask
 
-# Import doctor dashboard
-from dashboard_doctor import doctor_dashboard_layout, register_doctor_callbacks
-
-# Initialize app
+# Initialize app: the one server for every dashboard, so they share one process,
+# one api_client connection pool/cache and one set of loaded models
 app = dash.Dash(__name__, suppress_callback_exceptions=True, external_stylesheets=[dbc.themes.BOOTSTRAP])
 server = app.server
 
@@ -41,11 +41,26 @@ login_layout = dbc.Container([
     ], justify="center", align="center", style={"minHeight": "100vh"})
 ], fluid=True)
 
-# Placeholder Dashboards (Patient, Nurse, Admin, Frontdesk for now)
-patient_dashboard_layout = html.H1("🧑‍⚕️ Patient Dashboard - Coming Soon")
-nurse_dashboard_layout = html.H1("💉 Nurse Dashboard - Coming Soon")
-admin_dashboard_layout = html.H1("🛡️ Admin Dashboard - Coming Soon")
-frontdesk_dashboard_layout = html.H1("🧾 Frontdesk Dashboard - Coming Soon")
+# Pages: first path segment -> (page module, roles allowed). Each module exposes
+# layout(pathname) and register_callbacks(app) and does no work at import time.
+STAFF = {"doctor", "nurse", "frontdesk", "admin"}
+PAGES = {
+    '/doctor_dashboard': ("dashboard_doctor", {"doctor"}),
+    '/patient_dashboard': ("patient_portal", {"patient"}),
+    '/nurse_dashboard': ("nurse_portal", {"nurse"}),
+    '/admin_dashboard': ("reports", {"admin"}),
+    '/frontdesk_dashboard': ("dashboard_frontdesk", {"frontdesk"}),
+    '/patient_record': ("patient_record", STAFF),
+    '/risk_trend': ("risk_trend", STAFF),
+    '/reports': ("reports", STAFF),
+}
+HOME = {
+    "doctor": '/doctor_dashboard',
+    "patient": '/patient_dashboard',
+    "nurse": '/nurse_dashboard',
+    "admin": '/admin_dashboard',
+    "frontdesk": '/frontdesk_dashboard',
+}
 
 # Routing Logic
 @app.callback(
@@ -54,20 +69,13 @@ frontdesk_dashboard_layout = html.H1("🧾 Frontdesk Dashboard - Coming Soon")
     State('current_user', 'data')
 )
 def display_page(pathname, current_user):
-    if pathname == '/':
+    if pathname in (None, '/'):
         return login_layout
-    elif pathname == '/doctor_dashboard' and current_user and current_user['role'] == 'doctor':
-        return doctor_dashboard_layout
-    elif pathname == '/patient_dashboard' and current_user and current_user['role'] == 'patient':
-        return patient_dashboard_layout
-    elif pathname == '/nurse_dashboard' and current_user and current_user['role'] == 'nurse':
-        return nurse_dashboard_layout
-    elif pathname == '/admin_dashboard' and current_user and current_user['role'] == 'admin':
-        return admin_dashboard_layout
-    elif pathname == '/frontdesk_dashboard' and current_user and current_user['role'] == 'frontdesk':
-        return frontdesk_dashboard_layout
-    else:
-        return html.H1("❌ Access Denied. You are not authorized to view this page.")
+    page = PAGES.get('/' + pathname.strip('/').split('/')[0])
+    if page and current_user and current_user['role'] in page[1]:
+        # Layouts (and any data they need) are built on visit, not at startup
+        return importlib.import_module(page[0]).layout(pathname)
+    return html.H1("❌ Access Denied. You are not authorized to view this page.")
 
 # Login Authentication
 @app.callback(
@@ -83,23 +91,16 @@ def login_user(n_clicks, email, password):
     user = users.get(email)
     if user and user['password'] == password:
         # Login Successful
-        role = user['role']
-        if role == "doctor":
-            return user, '/doctor_dashboard', ""
-        elif role == "patient":
-            return user, '/patient_dashboard', ""
-        elif role == "nurse":
-            return user, '/nurse_dashboard', ""
-        elif role == "admin":
-            return user, '/admin_dashboard', ""
-        elif role == "frontdesk":
-            return user, '/frontdesk_dashboard', ""
+        return user, HOME[user['role']], ""
     else:
         # Login Failed
         return dash.no_update, dash.no_update, "Invalid email or password."
 
-# Register external dashboard callbacks
-register_doctor_callbacks(app)
+# Register page callbacks. The Dash front end fetches the callback graph once per
+# page load, so callbacks must exist before the first request even though the
+# pages themselves are only rendered when visited.
+for module_name in dict.fromkeys(module for module, _ in PAGES.values()):
+    importlib.import_module(module_name).register_callbacks(app)
 
 # Run Server
 if __name__ == '__main__':
@@ -1,9 +1,14 @@
 # backend.py
 
-from fastapi import FastAPI, Request
+from fastapi import FastAPI, Query, Request
 from fastapi.middleware.cors import CORSMiddleware
 from datetime import datetime
 import sqlite3
+import numpy as np
+import risk_scoring
+import downsample
+import table_query
+from database_setup import create_schema
 
 # Create FastAPI app instance
 app = FastAPI()
@@ -17,16 +22,161 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Derived tables (LatestRiskScores) must exist before the first request
+_conn = sqlite3.connect('healthcare.db')
+create_schema(_conn)
+_conn.close()
+
 # ---------- Helper: Query DB ----------
-def query_db(query, args=()):
-    conn = sqlite3.connect('healthcare.db')
+def query_db(query, args=(), conn=None):
+    """Run a query and return its rows as dicts; pass conn to reuse an open connection."""
+    own_conn = conn is None
+    if own_conn:
+        conn = sqlite3.connect('healthcare.db')
     conn.row_factory = sqlite3.Row
     cur = conn.cursor()
     cur.execute(query, args)
     results = cur.fetchall()
-    conn.close()
+    if own_conn:
+        conn.close()
     return [dict(row) for row in results]
 
+# ---------- Server-side Binning ----------
+AGE_SQL = "CAST((julianday('now') - julianday(p.date_of_birth)) / 365.25 AS INT)"
+LATEST_VITALS_JOIN = """
+    JOIN Vitals v ON v.vital_id = (
+        SELECT vital_id FROM Vitals WHERE patient_id = p.patient_id
+        ORDER BY record_date DESC, vital_id DESC LIMIT 1
+    )
+"""
+
+# Column -> (query yielding one value and gender per patient, default (min, max) or None to measure)
+DISTRIBUTION_COLUMNS = {
+    "age": (f"SELECT {AGE_SQL} AS value, p.gender FROM Patients p", None),
+    "heart_disease_risk": ("""
+        SELECT l.heart_disease_risk AS value, p.gender
+        FROM LatestRiskScores l JOIN Patients p ON p.patient_id = l.patient_id
+    """, (0.0, 1.0)),
+    "diabetes_risk": ("""
+        SELECT l.diabetes_risk AS value, p.gender
+        FROM LatestRiskScores l JOIN Patients p ON p.patient_id = l.patient_id
+    """, (0.0, 1.0)),
+    **{
+        column: (f"SELECT v.{column} AS value, p.gender FROM Patients p {LATEST_VITALS_JOIN}", None)
+        for column in ("heart_rate", "glucose_level", "bmi", "hemoglobin", "cholesterol")
+    },
+}
+
+# /age_demographics groups: whole-year ages 0-18, 19-35 and 36-55 are binned (the last
+# bin is closed, so it ends at 55); every other patient, including those with no valid
+# date of birth, falls in "55+", as the endpoint has always reported them
+AGE_GROUP_EDGES = [0, 19, 36, 55]
+AGE_GROUP_LABELS = ["0-18", "19-35", "36-55", "55+"]
+
+def distribution(conn, column, bins=20, lo=None, hi=None, edges=None, by_gender=False):
+    """Histogram of column (one value per patient) counted in SQL.
+
+    Bins are edges[i] <= value < edges[i + 1], the last one closed; without edges
+    they are `bins` equal-width bins over [lo, hi] (default: the column's range).
+    Empty bins are included so charts keep a fixed x axis.
+    """
+    source, default_range = DISTRIBUTION_COLUMNS[column]
+    if edges is None:
+        if lo is None or hi is None:
+            measured = default_range or conn.execute(f"SELECT MIN(value), MAX(value) FROM ({source})").fetchone()
+            lo = measured[0] if lo is None else lo
+            hi = measured[1] if hi is None else hi
+        if lo is None:  # no data
+            return {"column": column, "edges": [], "counts": []}
+        if hi < lo:  # only one bound given, on the wrong side of the measured range
+            return {"status": "error", "message": f"min {lo} is greater than max {hi}"}
+        if hi == lo:  # a single value: one unit-wide bin
+            edges = [lo, lo + 1.0]
+        else:
+            edges = [lo + i * (hi - lo) / bins for i in range(bins)] + [hi]
+    n_bins = len(edges) - 1
+
+    cases = " ".join(f"WHEN value < ? THEN {i}" for i in range(n_bins - 1))
+    group = "gender, " if by_gender else ""
+    rows = conn.execute(f"""
+        SELECT {group}bin, COUNT(*) FROM (
+            SELECT gender, CASE {cases} WHEN value <= ? THEN {n_bins - 1} END AS bin
+            FROM ({source})
+            WHERE value >= ?
+        )
+        WHERE bin IS NOT NULL
+        GROUP BY {group}bin
+    """, (*edges[1:], edges[0])).fetchall()
+
+    # Every bin of every group, even with no rows in range
+    if by_gender:
+        counts = {gender: [0] * n_bins for (gender,) in conn.execute(
+            "SELECT DISTINCT gender FROM Patients WHERE gender IS NOT NULL ORDER BY gender")}
+    else:
+        counts = {None: [0] * n_bins}
+    for row in rows:
+        key = row[0] if by_gender else None
+        counts.setdefault(key, [0] * n_bins)[row[-2]] = row[-1]
+    return {
+        "column": column,
+        "edges": edges,
+        "counts": [
+            {**({"gender": key} if by_gender else {}), "bin": i, "lower": edges[i], "upper": edges[i + 1], "count": n}
+            for key, values in counts.items() for i, n in enumerate(values)
+        ],
+    }
+
+# ---------- Top-k Risk ----------
+RISK_FILTERS = {
+    "heart": "l.heart_disease_risk {op} :min_risk",
+    "diabetes": "l.diabetes_risk {op} :min_risk",
+    "both": "(l.heart_disease_risk {op} :min_risk OR l.diabetes_risk {op} :min_risk)",
+}
+
+def top_risk(conn, k, risk_type="both", min_risk=0.0, gender=None, strict=False):
+    """The k patients with the highest combined risk on their latest score, one row each.
+
+    Walks idx_latest_combined_risk from the top and stops after k matching rows. Risks
+    are non-negative, so combined_risk >= min_risk also bounds the walk when few match.
+    strict=True requires a risk above min_risk rather than at or above it.
+    """
+    risk_filter = RISK_FILTERS[risk_type].format(op=">" if strict else ">=")
+    gender_filter = "AND p.gender = :gender" if gender else ""
+    return query_db(f"""
+        SELECT l.patient_id, p.first_name, p.last_name, p.gender, l.score_date,
+               l.heart_disease_risk, l.diabetes_risk, l.combined_risk
+        FROM LatestRiskScores l INDEXED BY idx_latest_combined_risk
+        JOIN Patients p ON p.patient_id = l.patient_id
+        WHERE l.combined_risk >= :min_risk AND {risk_filter} {gender_filter}
+        ORDER BY l.combined_risk DESC
+        LIMIT :k
+    """, {"min_risk": min_risk, "gender": gender, "k": k}, conn=conn)
+
+def age_demographics(conn):
+    binned = [g["count"] for g in distribution(conn, "age", edges=AGE_GROUP_EDGES)["counts"]]
+    total = conn.execute("SELECT COUNT(*) FROM Patients").fetchone()[0]
+    counts = binned + [total - sum(binned)]
+    return [{"age_group": label, "count": n} for label, n in zip(AGE_GROUP_LABELS, counts) if n]
+
+RECENT_LAB_REPORTS_QUERY = """
+    SELECT lr.*, p.first_name, p.last_name
+    FROM LabReports lr
+    JOIN Patients p ON lr.patient_id = p.patient_id
+    WHERE DATE(report_date) >= DATE('now', '-7 days')
+    ORDER BY report_date DESC
+    LIMIT 50
+"""
+
+MONTHLY_RISK_TRENDS_QUERY = """
+    SELECT 
+        strftime('%Y-%m', score_date) as month,
+        AVG(heart_disease_risk) as avg_heart_risk,
+        AVG(diabetes_risk) as avg_diabetes_risk
+    FROM RiskScores
+    GROUP BY month
+    ORDER BY month
+"""
+
 # ---------- Root Test ----------
 @app.get("/")
 def root():
@@ -37,6 +187,43 @@ def root():
 def get_active_patients():
     return query_db("SELECT * FROM Patients WHERE check_in_status = 'Checked-in'")
 
+# Columns the active-patient table may filter and sort on
+ACTIVE_PATIENT_COLUMNS = {
+    "patient_id": "patient_id",
+    "first_name": "first_name",
+    "last_name": "last_name",
+    "gender": "gender",
+    "date_of_birth": "date_of_birth",
+}
+
+@app.get("/active_patients_page")
+def get_active_patients_page(page: int = 0, page_size: int = 25, sort_by: str = "[]", filter_query: str = ""):
+    """One page of checked-in patients for a DataTable with custom paging/sorting/filtering.
+
+    sort_by is the table's sort_by list as JSON; filter_query is its filter string.
+    """
+    sort_list = table_query.parse_sort_by(sort_by)
+    if sort_list is None:
+        return {"status": "error",
+                "message": 'sort_by must be a JSON list of {"column_id": ..., "direction": "asc" or "desc"}'}
+    page_size = min(max(page_size, 1), 500)
+    where, params = table_query.sql_where(filter_query, ACTIVE_PATIENT_COLUMNS)
+    order = table_query.sql_order(sort_list, ACTIVE_PATIENT_COLUMNS, "patient_id")
+    conn = sqlite3.connect('healthcare.db')
+    try:
+        total = conn.execute(
+            f"SELECT COUNT(*) FROM Patients WHERE check_in_status = 'Checked-in'{where}", params).fetchone()[0]
+        rows = query_db(f"""
+            SELECT {', '.join(ACTIVE_PATIENT_COLUMNS)}
+            FROM Patients
+            WHERE check_in_status = 'Checked-in'{where}
+            ORDER BY {order}
+            LIMIT ? OFFSET ?
+        """, (*params, page_size, max(page, 0) * page_size), conn=conn)
+    finally:
+        conn.close()
+    return {"total": total, "page_count": table_query.page_count(total, page_size), "rows": rows}
+
 @app.get("/appointments_today")
 def get_appointments_today():
     return query_db("""
@@ -48,34 +235,41 @@ def get_appointments_today():
 
 @app.get("/age_demographics")
 def get_age_demographics():
-    return query_db("""
-        SELECT 
-            CASE 
-                WHEN age BETWEEN 0 AND 18 THEN '0-18'
-                WHEN age BETWEEN 19 AND 35 THEN '19-35'
-                WHEN age BETWEEN 36 AND 55 THEN '36-55'
-                ELSE '55+'
-            END AS age_group,
-            COUNT(*) as count
-        FROM (
-            SELECT 
-                patient_id,
-                CAST((julianday('now') - julianday(date_of_birth)) / 365.25 AS INT) AS age
-            FROM Patients
-        )
-        GROUP BY age_group
-    """)
+    conn = sqlite3.connect('healthcare.db')
+    try:
+        return age_demographics(conn)
+    finally:
+        conn.close()
+
+@app.get("/distribution")
+def get_distribution(column: str, bins: int = 20, lo: float = Query(None, alias="min"),
+                     hi: float = Query(None, alias="max"), edges: str = None, by_gender: bool = False):
+    """Binned counts of a numeric column, one value per patient (latest score / vitals).
+
+    edges is a comma-separated list (e.g. "0,19,36,56,200") and overrides bins/min/max.
+    """
+    if column not in DISTRIBUTION_COLUMNS:
+        return {"status": "error", "message": f"Unknown column: {column}. Choose from {sorted(DISTRIBUTION_COLUMNS)}"}
+    try:
+        edge_list = [float(e) for e in edges.split(",")] if edges else None
+    except ValueError:
+        return {"status": "error", "message": "edges must be comma-separated numbers"}
+    if edge_list is not None and (len(edge_list) < 2 or any(b <= a for a, b in zip(edge_list, edge_list[1:]))):
+        return {"status": "error", "message": "edges must be at least two increasing numbers"}
+    if lo is not None and hi is not None and lo > hi:
+        return {"status": "error", "message": f"min {lo} is greater than max {hi}"}
+    if not 1 <= bins <= 200:
+        return {"status": "error", "message": "bins must be between 1 and 200"}
+
+    conn = sqlite3.connect('healthcare.db')
+    try:
+        return distribution(conn, column, bins, lo, hi, edge_list, by_gender)
+    finally:
+        conn.close()
 
 @app.get("/recent_lab_reports")
 def get_recent_lab_reports():
-    return query_db("""
-        SELECT lr.*, p.first_name, p.last_name
-        FROM LabReports lr
-        JOIN Patients p ON lr.patient_id = p.patient_id
-        WHERE DATE(report_date) >= DATE('now', '-7 days')
-        ORDER BY report_date DESC
-        LIMIT 50
-    """)
+    return query_db(RECENT_LAB_REPORTS_QUERY)
 @app.get("/patient_details/{patient_id}")
 def get_patient_details(patient_id: int):
     return query_db("""
@@ -88,6 +282,17 @@ def get_patient_details(patient_id: int):
         GROUP BY p.patient_id
     """, (patient_id,))
 
+@app.get("/latest_vitals/{patient_id}")
+def get_latest_vitals(patient_id: int):
+    return query_db("""
+        SELECT v.*, CAST((julianday('now') - julianday(p.date_of_birth)) / 365.25 AS INT) AS age
+        FROM Vitals v
+        JOIN Patients p ON v.patient_id = p.patient_id
+        WHERE v.patient_id = ?
+        ORDER BY v.record_date DESC, v.vital_id DESC
+        LIMIT 1
+    """, (patient_id,))
+
 @app.get("/risk_scores")
 def get_risk_scores():
     return query_db("""
@@ -98,15 +303,7 @@ def get_risk_scores():
 
 @app.get("/monthly_risk_trends")
 def get_monthly_risk_trends():
-    return query_db("""
-        SELECT 
-            strftime('%Y-%m', score_date) as month,
-            AVG(heart_disease_risk) as avg_heart_risk,
-            AVG(diabetes_risk) as avg_diabetes_risk
-        FROM RiskScores
-        GROUP BY month
-        ORDER BY month
-    """)
+    return query_db(MONTHLY_RISK_TRENDS_QUERY)
 @app.get("/patient_risk_trend/{patient_id}")
 def get_patient_risk_trend(patient_id: int):
     return query_db("""
@@ -120,6 +317,140 @@ def get_patient_risk_trend(patient_id: int):
         ORDER BY month
     """, (patient_id,))
 
+# Section -> what computes it; each page asks only for the sections it renders
+SNAPSHOT_SECTIONS = {
+    "active_patient_count": lambda conn: query_db(
+        "SELECT COUNT(*) AS n FROM Patients WHERE check_in_status = 'Checked-in'", conn=conn)[0]["n"],
+    "appointments_today_count": lambda conn: query_db(
+        "SELECT COUNT(*) AS n FROM Appointments WHERE DATE(appointment_date) = DATE('now')", conn=conn)[0]["n"],
+    "recent_lab_reports": lambda conn: query_db(RECENT_LAB_REPORTS_QUERY, conn=conn),
+    "age_demographics": age_demographics,
+    "monthly_risk_trends": lambda conn: query_db(MONTHLY_RISK_TRENDS_QUERY, conn=conn),
+}
+
+@app.get("/dashboard_snapshot")
+def get_dashboard_snapshot(sections: str = None):
+    """What the nurse and front-desk overview pages show, read over one connection, so each
+    refresh tick is a single request. sections is a comma-separated subset of
+    SNAPSHOT_SECTIONS (default: all of them)."""
+    names = sections.split(",") if sections else list(SNAPSHOT_SECTIONS)
+    unknown = [name for name in names if name not in SNAPSHOT_SECTIONS]
+    if unknown:
+        return {"status": "error", "message": f"Unknown sections: {unknown}. Choose from {list(SNAPSHOT_SECTIONS)}"}
+    conn = sqlite3.connect('healthcare.db')
+    try:
+        return {"generated_at": datetime.now().isoformat(),
+                **{name: SNAPSHOT_SECTIONS[name](conn) for name in names}}
+    finally:
+        conn.close()
+
+@app.get("/report_summary")
+def get_report_summary(top_k: int = 10, high_risk: float = 0.8):
+    """Pre-aggregated data for reports.py: a few dozen rows, whatever the history size.
+
+    Distributions are 20-bin histograms over each patient's age and latest scores.
+    """
+    conn = sqlite3.connect('healthcare.db')
+    try:
+        return {
+            "gender_counts": query_db(
+                "SELECT gender, COUNT(*) AS count FROM Patients GROUP BY gender", conn=conn),
+            "age_distribution": distribution(conn, "age", bins=20),
+            "heart_risk_distribution": distribution(conn, "heart_disease_risk", bins=20),
+            "diabetes_risk_distribution": distribution(conn, "diabetes_risk", bins=20),
+            # Strictly above high_risk, as the reports table has always listed them
+            "high_risk_patients": top_risk(conn, top_k, "both", high_risk, strict=True),
+        }
+    finally:
+        conn.close()
+
+@app.get("/top_risk")
+def get_top_risk(k: int = 100, risk_type: str = "both", min_risk: float = 0.0, gender: str = None):
+    """Highest combined-risk patients by latest score, deduplicated, filtered like patient_record."""
+    if risk_type not in RISK_FILTERS:
+        return {"status": "error", "message": f"risk_type must be one of {sorted(RISK_FILTERS)}"}
+    if not 1 <= k <= 10_000:
+        return {"status": "error", "message": "k must be between 1 and 10000"}
+    conn = sqlite3.connect('healthcare.db')
+    try:
+        return top_risk(conn, k, risk_type, min_risk, gender)
+    finally:
+        conn.close()
+
+@app.get("/latest_risk_snapshot")
+def get_latest_risk_snapshot(since: str = None):
+    """Every patient's latest score as compact columns, ordered by combined risk (highest first).
+
+    patient_record filters and ranks this in the browser; version changes whenever
+    LatestRiskScores or a listed patient does (new scores show in its count and max
+    risk_id; score edits, patient renames, gender changes and deletes in the
+    SnapshotEdits counters). A client passing the version it holds as since gets
+    {"version", "unchanged": true} back without the columns while it is current.
+    """
+    conn = sqlite3.connect('healthcare.db')
+    try:
+        conn.execute("BEGIN")  # version and rows from the same snapshot of the table
+        count, max_risk_id, edits = conn.execute("""
+            SELECT COUNT(*), COALESCE(MAX(risk_id), 0),
+                   (SELECT COALESCE(SUM(edits), 0) FROM SnapshotEdits)
+            FROM LatestRiskScores
+        """).fetchone()
+        version = f"{count}-{max_risk_id}-{edits}"
+        if since == version:
+            return {"version": version, "unchanged": True}
+        rows = conn.execute("""
+            SELECT l.patient_id, p.first_name, p.last_name, p.gender, l.score_date,
+                   ROUND(l.heart_disease_risk, 2), ROUND(l.diabetes_risk, 2)
+            FROM LatestRiskScores l INDEXED BY idx_latest_combined_risk
+            JOIN Patients p ON p.patient_id = l.patient_id
+            ORDER BY l.combined_risk DESC
+        """).fetchall()
+    finally:
+        conn.close()
+    names = ["patient_id", "first_name", "last_name", "gender", "score_date", "heart_disease_risk", "diabetes_risk"]
+    columns = [list(column) for column in zip(*rows)] if rows else [[] for _ in names]
+    return {"version": version, "columns": dict(zip(names, columns))}
+
+@app.get("/genders")
+def get_genders():
+    return [row["gender"] for row in query_db("SELECT DISTINCT gender FROM Patients WHERE gender IS NOT NULL ORDER BY gender")]
+
+@app.get("/risk_series")
+def get_risk_series(patient_id: int = None, max_points: int = 2000, method: str = "lttb"):
+    """Heart and diabetes risk over time (one patient, or all scores), downsampled to at most
+    max_points per series with "lttb" or "minmax"; max_points=0 returns every point."""
+    if method not in ("lttb", "minmax"):
+        return {"status": "error", "message": "method must be 'lttb' or 'minmax'"}
+    # Both methods keep the first and last points; minmax also needs a full min/max bucket
+    if max_points != 0 and max_points < 4:
+        return {"status": "error", "message": "max_points must be 0 (every point) or at least 4"}
+    where = "WHERE patient_id = ?" if patient_id is not None else ""
+    conn = sqlite3.connect('healthcare.db')
+    try:
+        rows = conn.execute(f"""
+            SELECT (julianday(score_date) - 2440587.5) * 86400000.0, heart_disease_risk, diabetes_risk, score_date
+            FROM RiskScores
+            {where}
+            ORDER BY score_date, risk_id
+        """, () if patient_id is None else (patient_id,)).fetchall()
+    finally:
+        conn.close()
+
+    rows = [row for row in rows if row[0] is not None]
+    latest = dict(zip(("score_date", "heart_disease_risk", "diabetes_risk"), (rows[-1][3], *rows[-1][1:3]))) if rows else None
+    t = np.array([row[0] for row in rows], dtype=float)
+    # The julianday arithmetic lands a hair either side of the millisecond; truncating would lose one
+    dates = np.rint(t).astype("datetime64[ms]").astype(str)
+    series = {}
+    for column, values in (("heart_disease_risk", [row[1] for row in rows]), ("diabetes_risk", [row[2] for row in rows])):
+        y = np.asarray(values, dtype=float)
+        if max_points and len(y) > max_points:
+            keep = downsample.lttb(t, y, max_points) if method == "lttb" else downsample.minmax(y, max_points)
+        else:
+            keep = np.arange(len(y))
+        series[column] = {"x": dates[keep].tolist(), "y": y[keep].tolist()}
+    return {"patient_id": patient_id, "total_points": len(rows), "method": method, "series": series, "latest": latest}
+
 @app.get("/test_db")
 def test_db():
     return query_db("SELECT name FROM sqlite_master WHERE type='table'")
@@ -161,6 +492,66 @@ async def save_lab_report(request: Request):
     except Exception as e:
         return {"status": "error", "message": str(e)}
 
+# ---------- POST Endpoint to Check In a Patient ----------
+@app.post("/check_in")
+async def check_in(request: Request):
+    try:
+        data = await request.json()
+        if 'patient_id' not in data:
+            return {"status": "error", "message": "Missing key: patient_id"}
+
+        patient_id = data['patient_id']
+        status = data.get('check_in_status', 'Checked-in')
+
+        conn = sqlite3.connect("healthcare.db")
+        cursor = conn.cursor()
+
+        cursor.execute("UPDATE Patients SET check_in_status = ? WHERE patient_id = ?", (status, patient_id))
+        if cursor.rowcount == 0:
+            conn.close()
+            return {"status": "error", "message": "Invalid patient_id. Patient not found."}
+
+        conn.commit()
+        conn.close()
+
+        return {"status": "success", "message": f"Patient status set to {status}."}
+
+    except Exception as e:
+        return {"status": "error", "message": str(e)}
+
+# ---------- POST Endpoint to Save Vitals ----------
+@app.post("/save_vitals")
+async def save_vitals(request: Request):
+    try:
+        data = await request.json()
+        required_keys = ['patient_id', 'blood_pressure', 'heart_rate', 'glucose_level', 'bmi', 'hemoglobin', 'cholesterol']
+        for key in required_keys:
+            if key not in data:
+                return {"status": "error", "message": f"Missing key: {key}"}
+
+        conn = sqlite3.connect("healthcare.db")
+        cursor = conn.cursor()
+
+        cursor.execute("SELECT 1 FROM Patients WHERE patient_id = ?", (data['patient_id'],))
+        if cursor.fetchone() is None:
+            conn.close()
+            return {"status": "error", "message": "Invalid patient_id. Patient not found."}
+
+        cursor.execute("""
+            INSERT INTO Vitals (patient_id, record_date, blood_pressure, heart_rate,
+                                glucose_level, bmi, hemoglobin, cholesterol)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+        """, (data['patient_id'], data.get('record_date', datetime.now().isoformat()), data['blood_pressure'],
+              data['heart_rate'], data['glucose_level'], data['bmi'], data['hemoglobin'], data['cholesterol']))
+
+        conn.commit()
+        conn.close()
+
+        return {"status": "success", "message": "Vitals saved successfully."}
+
+    except Exception as e:
+        return {"status": "error", "message": str(e)}
+
 # ---------- POST Endpoint ----------
 @app.post("/save_risk")
 async def save_risk(request: Request):
@@ -186,7 +577,7 @@ async def save_risk(request: Request):
         cursor.execute("""
             INSERT INTO RiskScores (patient_id, score_date, heart_disease_risk, diabetes_risk)
             VALUES (?, ?, ?, ?)
-        """, (patient_id, datetime.now().isoformat(), heart_risk, diabetes_risk))
+        """, (patient_id, data.get('score_date', datetime.now().isoformat()), heart_risk, diabetes_risk))
 
         conn.commit()
         conn.close()
@@ -196,6 +587,45 @@ async def save_risk(request: Request):
     except Exception as e:
         return {"status": "error", "message": str(e)}
 
+# ---------- POST Endpoint to Score Vitals ----------
+@app.post("/calculate_risk")
+async def calculate_risk(request: Request):
+    try:
+        data = await request.json()
+        rows = data if isinstance(data, list) else [data]
+        required_keys = ['age', 'blood_pressure', 'heart_rate', 'glucose_level', 'bmi', 'hemoglobin', 'cholesterol']
+        for key in required_keys:
+            if any(key not in row for row in rows):
+                return {"status": "error", "message": f"Missing key: {key}"}
+
+        vitals = {key: [row[key] for row in rows] for key in required_keys}
+        systolic, diastolic = risk_scoring.split_blood_pressure(vitals.pop("blood_pressure"))
+        bad = np.flatnonzero(~(np.isfinite(systolic) & np.isfinite(diastolic)))
+        if len(bad):
+            return {"status": "error",
+                    "message": f"Malformed blood_pressure {rows[bad[0]]['blood_pressure']!r} in row {bad[0]}; "
+                               f"expected 'systolic/diastolic'"}
+
+        scores = risk_scoring.score_vitals({**vitals, "systolic": systolic, "diastolic": diastolic})
+        if not (np.isfinite(scores["heart_disease_risk"]).all() and np.isfinite(scores["diabetes_risk"]).all()):
+            return {"status": "error", "message": "Vitals must be finite numbers"}
+        results = [
+            {
+                "heart_disease_risk": heart,
+                "diabetes_risk": diabetes,
+                "heart_band": heart_band,
+                "diabetes_band": diabetes_band,
+            }
+            for heart, diabetes, heart_band, diabetes_band in zip(
+                scores["heart_disease_risk"].tolist(), scores["diabetes_risk"].tolist(),
+                scores["heart_band"].tolist(), scores["diabetes_band"].tolist()
+            )
+        ]
+        return {"status": "success", "scores": results}
+
+    except Exception as e:
+        return {"status": "error", "message": str(e)}
+
 # ---------- Run if executed directly ----------
 if __name__ == "__main__":
     import uvicorn
@@ -0,0 +1,189 @@
+# batch_rescore.py
+
+import argparse
+import json
+import os
+import sqlite3
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+from itertools import repeat
+
+import joblib
+import numpy as np
+import pandas as pd
+
+import model_registry
+from database_setup import create_schema
+from model_loader import MODEL_FILES, MULTI_OUTPUT
+from risk_scoring import FEATURES, split_blood_pressure
+
+# Each patient's most recent vitals, walked in patient_id order (keyset pagination).
+# The correlated subquery is answered from idx_vitals_patient_date.
+LATEST_VITALS_QUERY = """
+SELECT
+    p.patient_id,
+    CAST((julianday('now') - julianday(p.date_of_birth)) / 365.25 AS INT) AS age,
+    v.blood_pressure, v.heart_rate, v.glucose_level, v.bmi, v.hemoglobin, v.cholesterol
+FROM Patients p
+JOIN Vitals v ON v.vital_id = (
+    SELECT vital_id FROM Vitals
+    WHERE patient_id = p.patient_id
+    ORDER BY record_date DESC, vital_id DESC
+    LIMIT 1
+)
+WHERE p.patient_id > ?
+ORDER BY p.patient_id
+LIMIT ?
+"""
+
+# ---------- Models ----------
+def resolve_models():
+    """Pin the versions to score with: the live multi-output model if there is one,
+    otherwise the live heart and diabetes models ("legacy" = flat .pkl artifact)."""
+    combined = model_registry.current_version(MULTI_OUTPUT)
+    if combined:
+        return {MULTI_OUTPUT: combined}
+    return {name: model_registry.current_version(name) or "legacy" for name in MODEL_FILES}
+
+_worker_models = {}
+
+def _init_worker(versions):
+    # Native models: compiled predictors only pay off for single rows
+    for name, version in versions.items():
+        if version == "legacy":
+            _worker_models[name] = joblib.load(MODEL_FILES[name], mmap_mode="r")
+        else:
+            _worker_models[name] = model_registry.load(name, version)[1]
+
+def _score_chunk(X):
+    features = pd.DataFrame(X, columns=FEATURES)
+    if MULTI_OUTPUT in _worker_models:
+        both = np.asarray(_worker_models[MULTI_OUTPUT].predict(features))
+        heart, diabetes = both[:, 0], both[:, 1]
+    else:
+        heart = _worker_models["heart"].predict(features)
+        diabetes = _worker_models["diabetes"].predict(features)
+    # Float32 inputs give float32 predictions; round in float64 so 0.85 is stored as 0.85
+    heart, diabetes = np.asarray(heart, dtype=np.float64), np.asarray(diabetes, dtype=np.float64)
+    return np.round(np.clip(heart, 0, 1), 2), np.round(np.clip(diabetes, 0, 1), 2)
+
+# ---------- Reading ----------
+def read_chunk(conn, after, chunk_size):
+    """(patient_ids, feature matrix, patients read, last patient_id) for the next chunk."""
+    rows = conn.execute(LATEST_VITALS_QUERY, (after, chunk_size)).fetchall()
+    if not rows:
+        return None
+    columns = list(zip(*rows))
+    systolic, diastolic = split_blood_pressure(columns[2])
+    # FEATURES order: age, systolic, diastolic, heart_rate, glucose_level, bmi, hemoglobin, cholesterol
+    X = np.column_stack([
+        np.asarray(columns[1], dtype=float), systolic, diastolic,
+        *(np.asarray(column, dtype=float) for column in columns[3:]),
+    ])
+    valid = ~np.isnan(X).any(axis=1)
+    patient_ids = np.asarray(columns[0])
+    return patient_ids[valid], X[valid].astype(np.float32), len(rows), int(patient_ids[-1])
+
+# ---------- Runs ----------
+def start_run(conn, restart=False):
+    """Resume the last unfinished run (same score_date and model versions) or start a new one."""
+    run = conn.execute("""
+        SELECT run_id, score_date, model_versions, last_patient_id, rows_written
+        FROM RescoreRuns WHERE status = 'running' ORDER BY run_id DESC LIMIT 1
+    """).fetchone()
+    if run and not restart:
+        run_id, score_date, versions, last_patient_id, rows_written = run
+        print(f"↩️ Resuming run {run_id} after patient {last_patient_id} ({rows_written} rows already written).")
+        return run_id, score_date, json.loads(versions), last_patient_id, rows_written
+
+    conn.execute("UPDATE RescoreRuns SET status = 'abandoned' WHERE status = 'running'")
+    now = datetime.now().isoformat()
+    versions = resolve_models()
+    cursor = conn.execute("""
+        INSERT INTO RescoreRuns (started_at, score_date, model_versions, last_patient_id, rows_written, status)
+        VALUES (?, ?, ?, 0, 0, 'running')
+    """, (now, now, json.dumps(versions)))
+    conn.commit()
+    return cursor.lastrowid, now, versions, 0, 0
+
+def rescore(db_path="healthcare.db", workers=None, chunk_size=5_000, window_minutes=None, restart=False):
+    """Score every patient's latest vitals with the live models and append RiskScores rows.
+
+    Each chunk's inserts and the run checkpoint commit in one transaction, so an
+    interrupted run resumes exactly after the last written patient. With
+    window_minutes the job stops taking new chunks once the window is used up.
+    """
+    conn = sqlite3.connect(db_path, timeout=30)
+    create_schema(conn)
+    conn.execute("PRAGMA synchronous = NORMAL")
+    run_id, score_date, versions, after, rows_written = start_run(conn, restart)
+    remaining = conn.execute("SELECT COUNT(*) FROM Patients WHERE patient_id > ?", (after,)).fetchone()[0]
+    print(f"Rescoring {remaining} patients with {versions} (run {run_id}, score_date {score_date})...")
+
+    started = time.perf_counter()
+    deadline = started + window_minutes * 60 if window_minutes else None
+    workers = workers or os.cpu_count() or 1
+    written = read = skipped = 0
+    exhausted = stopped = False
+    in_flight = deque()
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(versions,)) as pool:
+        while in_flight or not (exhausted or stopped):
+            # Keep every worker busy with one chunk queued behind it
+            while not (exhausted or stopped) and len(in_flight) < 2 * workers:
+                if deadline and time.perf_counter() > deadline:
+                    stopped = True
+                    break
+                chunk = read_chunk(conn, after, chunk_size)
+                if chunk is None:
+                    exhausted = True
+                    break
+                patient_ids, X, n_read, after = chunk
+                read += n_read
+                skipped += n_read - len(patient_ids)
+                # A chunk with no valid rows is not sent to the models, but still moves the checkpoint
+                future = pool.submit(_score_chunk, X) if len(X) else None
+                in_flight.append((future, patient_ids, after))
+            if not in_flight:
+                break
+
+            # Write in submission order so the checkpoint only ever moves forward
+            future, patient_ids, last_patient_id = in_flight.popleft()
+            heart, diabetes = future.result() if future else (np.empty(0), np.empty(0))
+            conn.executemany("""
+                INSERT INTO RiskScores (patient_id, score_date, heart_disease_risk, diabetes_risk)
+                VALUES (?, ?, ?, ?)
+            """, zip(patient_ids.tolist(), repeat(score_date), heart.tolist(), diabetes.tolist()))
+            conn.execute("UPDATE RescoreRuns SET last_patient_id = ?, rows_written = rows_written + ? WHERE run_id = ?",
+                         (last_patient_id, len(patient_ids), run_id))
+            conn.commit()
+            written += len(patient_ids)
+
+            elapsed = time.perf_counter() - started
+            print(f"  patient {last_patient_id}: {written} rows ({written / max(elapsed, 1e-9):,.0f} rows/s)")
+
+    if exhausted:
+        conn.execute("UPDATE RescoreRuns SET status = 'done', finished_at = ? WHERE run_id = ?",
+                     (datetime.now().isoformat(), run_id))
+        conn.commit()
+    conn.close()
+
+    elapsed = time.perf_counter() - started
+    print(f"\n{'✅ Rescoring complete' if exhausted else '⏸️ Window used up; rerun to resume'}: "
+          f"{written} rows written in {elapsed:.1f}s ({written / max(elapsed, 1e-9):,.0f} rows/s), "
+          f"{skipped} patients skipped for malformed vitals, {rows_written + written} rows in run {run_id}.")
+    return {"run_id": run_id, "written": written, "read": read, "skipped": skipped,
+            "elapsed_s": round(elapsed, 2), "done": exhausted}
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Rescore every patient's latest vitals with the live models.")
+    parser.add_argument("--db", default="healthcare.db")
+    parser.add_argument("--workers", type=int, default=None, help="scoring processes (default: all cores)")
+    parser.add_argument("--chunk-size", type=int, default=5_000, help="patients per chunk")
+    parser.add_argument("--window-minutes", type=float, default=None,
+                        help="stop taking new chunks after this long; the next run resumes")
+    parser.add_argument("--restart", action="store_true", help="abandon an unfinished run and start over")
+    args = parser.parse_args()
+
+    rescore(args.db, args.workers, args.chunk_size, args.window_minutes, args.restart)
@@ -0,0 +1,88 @@
+# bulk_loader.py
+
+import argparse
+import csv
+import glob
+import itertools
+import json
+import os
+import sqlite3
+import time
+
+from database_setup import create_schema, drop_latest_risk_trigger
+
+# Tables are loaded parents first so patient_id references always resolve
+TABLE_ORDER = ["Patients", "Appointments", "LabReports", "Vitals", "RiskScores"]
+
+def iter_part_batches(path, fmt, batch_rows):
+    """Yield (columns, rows) batches from one part file without reading it whole."""
+    if fmt == "parquet":
+        import pyarrow.parquet as pq
+        part = pq.ParquetFile(path)
+        for batch in part.iter_batches(batch_size=batch_rows):
+            yield batch.schema.names, list(zip(*(column.to_pylist() for column in batch.columns)))
+    else:
+        with open(path, newline="") as f:
+            reader = csv.reader(f)
+            columns = next(reader)
+            while True:
+                # Column affinity turns the CSV text back into INTEGER/REAL values
+                rows = list(itertools.islice(reader, batch_rows))
+                if not rows:
+                    break
+                yield columns, rows
+
+def load_dataset(data_dir, db_path='healthcare.db', batch_rows=100_000, commit_rows=1_000_000):
+    """Stream an exported dataset (see data_geneator.py --export) into db_path.
+
+    Rows are inserted with their exported IDs, so load into a fresh database.
+    Memory holds one batch at a time; commits happen every commit_rows rows.
+    """
+    with open(os.path.join(data_dir, "manifest.json")) as f:
+        manifest = json.load(f)
+    fmt = manifest["format"]
+
+    conn = sqlite3.connect(db_path)
+    create_schema(conn)
+    drop_latest_risk_trigger(conn)
+    conn.execute("PRAGMA synchronous = OFF")
+    conn.execute("PRAGMA journal_mode = MEMORY")
+    conn.execute("PRAGMA cache_size = -200000")
+
+    started = time.perf_counter()
+    total = 0
+    for table in TABLE_ORDER:
+        table_started = time.perf_counter()
+        loaded = 0
+        pending = 0
+        for path in sorted(glob.glob(os.path.join(data_dir, table, f"part-*.{fmt}"))):
+            for columns, rows in iter_part_batches(path, fmt, batch_rows):
+                placeholders = ", ".join("?" for _ in columns)
+                conn.executemany(
+                    f"INSERT INTO {table} ({', '.join(columns)}) VALUES ({placeholders})", rows
+                )
+                loaded += len(rows)
+                pending += len(rows)
+                if pending >= commit_rows:
+                    conn.commit()
+                    pending = 0
+        conn.commit()
+        elapsed = time.perf_counter() - table_started
+        print(f"Loaded {loaded:,} rows into {table} ({loaded / max(elapsed, 1e-9):,.0f} rows/s)...")
+        total += loaded
+
+    create_schema(conn)  # restores the trigger and rebuilds LatestRiskScores in one pass
+    conn.close()
+    elapsed = time.perf_counter() - started
+    print(f"✅ Bulk load complete: {total:,} rows in {elapsed:.1f}s ({total / max(elapsed, 1e-9):,.0f} rows/s).")
+    return total
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Bulk-load an exported dataset into SQLite.")
+    parser.add_argument("data_dir", help="directory written by data_geneator.py --export")
+    parser.add_argument("--db", default="healthcare.db")
+    parser.add_argument("--batch-rows", type=int, default=100_000)
+    parser.add_argument("--commit-rows", type=int, default=1_000_000)
+    args = parser.parse_args()
+
+    load_dataset(args.data_dir, args.db, args.batch_rows, args.commit_rows)
@@ -4,16 +4,10 @@ import dash
 from dash import html, dcc, Input, Output, State
 import dash_bootstrap_components as dbc
 import pandas as pd
-import requests
+import api_client
 import plotly.express as px
-import joblib
-
-# Load models
-heart_model = joblib.load("heart_risk_model.pkl")
-diabetes_model = joblib.load("diabetes_risk_model.pkl")
-
-# API Endpoint
-API = "http://localhost:8000"
+import risk_scoring
+import model_loader
 
 # ========== Sidebar ==========
 sidebar = html.Div(
@@ -31,7 +25,7 @@ sidebar = html.Div(
                 dbc.NavLink("🧑‍⚕️ Patient Records", href="/patient_record", active="exact"),
                 dbc.NavLink("❤️ Risk Assessment", href="/risk_trend", active="exact"),
                 dbc.NavLink("🧪 Lab Results", href="#", active="exact"),
-                dbc.NavLink("📄 Reports", href="#", active="exact"),
+                dbc.NavLink("📄 Reports", href="/reports", active="exact"),
                 dbc.NavLink("⚙️ Settings", href="#", active="exact"),
             ],
             vertical=True,
@@ -92,8 +86,11 @@ doctor_dashboard_layout = html.Div([
     layout_content
 ])
 
+def layout(pathname=None):
+    return doctor_dashboard_layout
+
 # ========== Callbacks ==========
-def register_doctor_callbacks(app):
+def register_callbacks(app):
 
     @app.callback(
         Output("patient-selector", "options"),
@@ -101,7 +98,7 @@ def register_doctor_callbacks(app):
     )
     def load_patients(_):
         try:
-            patients = requests.get(f"{API}/active_patients").json()
+            patients = api_client.get("/active_patients")
             return [{"label": f"{p['first_name']} {p['last_name']}", "value": p["patient_id"]} for p in patients]
         except:
             return []
@@ -116,20 +113,18 @@ def register_doctor_callbacks(app):
 
         try:
             # Get risk scores
-            risk_data = requests.get(f"{API}/risk_scores").json()
+            risk_data = api_client.get("/risk_scores")
             risk = next((r for r in risk_data if r["patient_id"] == patient_id), None)
             if not risk:
                 return dbc.Alert("❌ No risk score found for this patient.", color="danger")
 
             heart_risk = risk['heart_disease_risk']
             diabetes_risk = risk['diabetes_risk']
-            heart_label = "High Risk" if heart_risk > 0.7 else "Moderate Risk" if heart_risk > 0.4 else "Low Risk"
-            diabetes_label = "High Risk" if diabetes_risk > 0.7 else "Moderate Risk" if diabetes_risk > 0.4 else "Low Risk"
-            heart_bar_color = "danger" if heart_risk > 0.7 else "warning" if heart_risk > 0.4 else "success"
-            diabetes_bar_color = "danger" if diabetes_risk > 0.7 else "warning" if diabetes_risk > 0.4 else "success"
+            heart_label, diabetes_label = risk_scoring.risk_band([heart_risk, diabetes_risk])
+            heart_bar_color, diabetes_bar_color = risk_scoring.risk_color([heart_risk, diabetes_risk])
 
             # Get patient demographics
-            info_response = requests.get(f"{API}/patient_details/{patient_id}").json()
+            info_response = api_client.get(f"/patient_details/{patient_id}")
             if not info_response:
                 return dbc.Alert("❌ No patient details found.", color="danger")
 
@@ -148,8 +143,20 @@ def register_doctor_callbacks(app):
             except:
                 last_visit = "N/A"
 
+            # Model estimate from the latest vitals (models load on first use)
+            heart_estimate = diabetes_estimate = "Model estimate unavailable"
+            try:
+                vitals = api_client.get(f"/latest_vitals/{patient_id}")
+                if vitals:
+                    features = model_loader.vitals_to_features(vitals[0]["age"], vitals[0])
+                    heart_pred, diabetes_pred = model_loader.predict_risk(features)
+                    heart_estimate = f"Model estimate from latest vitals: {int(heart_pred[0] * 100)}%"
+                    diabetes_estimate = f"Model estimate from latest vitals: {int(diabetes_pred[0] * 100)}%"
+            except Exception:
+                pass
+
             # Risk trend
-            trend_data = requests.get(f"{API}/patient_risk_trend/{patient_id}").json()
+            trend_data = api_client.get(f"/patient_risk_trend/{patient_id}")
             df_trend = pd.DataFrame(trend_data)
             fig = px.line(df_trend, x='month', y=['avg_heart_risk', 'avg_diabetes_risk'],
                           markers=True, title='Risk Score History')
@@ -179,6 +186,7 @@ def register_doctor_callbacks(app):
                             dbc.CardBody([
                                 dbc.Progress(value=heart_risk * 100, color=heart_bar_color, striped=True, animated=True),
                                 html.P(f"Risk Score: {int(heart_risk * 100)}% ({heart_label})", className="mt-2"),
+                                html.P(heart_estimate, className="text-muted small mb-1"),
                                 html.Small("Factors: High BP, Cholesterol", className="text-muted")
                             ])
                         ], className="shadow-sm")
@@ -189,6 +197,7 @@ def register_doctor_callbacks(app):
                             dbc.CardBody([
                                 dbc.Progress(value=diabetes_risk * 100, color=diabetes_bar_color, striped=True, animated=True),
                                 html.P(f"Risk Score: {int(diabetes_risk * 100)}% ({diabetes_label})", className="mt-2"),
+                                html.P(diabetes_estimate, className="text-muted small mb-1"),
                                 html.Small("Factors: Glucose, BMI", className="text-muted")
                             ])
                         ], className="shadow-sm")
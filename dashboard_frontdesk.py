@@ -1,15 +1,15 @@
 # dashboard_frontdesk.py (Professional Frontend)
 
-import dash
 from dash import html, dcc, Input, Output, State
 import dash_bootstrap_components as dbc
 import pandas as pd
-import requests
+import api_client
 import plotly.express as px
 
-app = dash.Dash(__name__, external_stylesheets=[dbc.themes.LUX], suppress_callback_exceptions=True)
-server = app.server
-API = "http://localhost:8000"
+# Served by app.py under PATH; sub-pages live at PATH + "/visits" etc.
+PATH = "/frontdesk_dashboard"
+# The /dashboard_snapshot sections this page renders
+SNAPSHOT_SECTIONS = "active_patient_count,appointments_today_count,age_demographics,monthly_risk_trends,recent_lab_reports"
 
 # ===== Sidebar =====
 sidebar = html.Div(
@@ -23,12 +23,12 @@ sidebar = html.Div(
         ),
         dbc.Nav(
             [
-                dbc.NavLink("🏥 Dashboard", href="/", active="exact"),
+                dbc.NavLink("🏥 Dashboard", href=PATH, active="exact"),
                 dbc.NavLink("🧑‍⚕️ Patient Profiles", href="/patient_record", active="exact"),
-                dbc.NavLink("📋 Visit Records", href="/visits", active="exact"),
-                dbc.NavLink("💊 Medications", href="/medications", active="exact"),
+                dbc.NavLink("📋 Visit Records", href=PATH + "/visits", active="exact"),
+                dbc.NavLink("💊 Medications", href=PATH + "/medications", active="exact"),
                 dbc.NavLink("📈 Reports", href="/reports", active="exact"),
-                dbc.NavLink("⚙️ Settings", href="/settings", active="exact")
+                dbc.NavLink("⚙️ Settings", href=PATH + "/settings", active="exact")
             ],
             vertical=True,
             pills=True,
@@ -71,7 +71,7 @@ def get_dashboard_layout():
             dbc.Col(dbc.Card([
                 dbc.CardBody([
                     html.H6("Active Patients", className="text-muted"),
-                    html.H2(id="active-patient-count", className="text-primary fw-bold"),
+                    html.H2(id="frontdesk-active-patient-count", className="text-primary fw-bold"),
                     html.P("+5% from last month", className="text-muted")
                 ])
             ], className="shadow-sm p-3 bg-light"), width=4),
@@ -79,15 +79,15 @@ def get_dashboard_layout():
             dbc.Col(dbc.Card([
                 dbc.CardBody([
                     html.H6("Appointments Today", className="text-muted"),
-                    html.H2(id="appointment-count", className="text-danger fw-bold"),
-                    html.P(id="appointment-remaining", className="text-muted")
+                    html.H2(id="frontdesk-appointment-count", className="text-danger fw-bold"),
+                    html.P(id="frontdesk-appointment-remaining", className="text-muted")
                 ])
             ], className="shadow-sm p-3 bg-light"), width=4),
 
             dbc.Col(dbc.Card([
                 dbc.CardBody([
                     html.H6("Health Trends (Last 6 Months)", className="text-muted"),
-                    dcc.Graph(id="health-trend-chart", style={"height": "250px"})
+                    dcc.Graph(id="frontdesk-health-trend-chart", style={"height": "250px"})
                 ])
             ], className="shadow-sm p-3 bg-light"), width=4)
         ], className="mb-4"),
@@ -96,15 +96,16 @@ def get_dashboard_layout():
             dbc.Col(dbc.Card([
                 dbc.CardBody([
                     html.H6("Patient Demographics", className="text-muted"),
-                    dcc.Graph(id="age-group-pie", style={"height": "300px"})
+                    dcc.Graph(id="frontdesk-age-group-pie", style={"height": "300px"})
                 ])
             ], className="shadow-sm p-3 bg-light"), width=6),
 
             dbc.Col(dbc.Card([
                 dbc.CardBody([
                     html.H6("Recent Lab Reports", className="text-muted"),
-                    dcc.Interval(id="refresh-interval", interval=10*1000, n_intervals=0),
-                    html.Div(id="recent-activity-wrapper")
+                    dcc.Interval(id="frontdesk-refresh-interval", interval=10*1000, n_intervals=0),
+                    dcc.Store(id="frontdesk-snapshot"),
+                    html.Div(id="frontdesk-recent-activity-wrapper")
                 ])
             ], className="shadow-sm p-3 bg-light"), width=6)
         ], className="mb-4"),
@@ -117,17 +118,17 @@ def get_placeholder_layout(title):
         html.P("This page is under development. Please check back soon.")
     ], style={"marginLeft": "16%", "padding": "30px"})
 
-# ===== App Layout =====
-app.layout = html.Div([
-    dcc.Location(id="url"),
-    sidebar,
-    header,
-    html.Div(id="page-content")
-])
+# ===== Page Layout =====
+def layout(pathname=PATH):
+    return html.Div([
+        sidebar,
+        header,
+        display_page(pathname)
+    ])
 
 # ===== Routing =====
-@app.callback(Output("page-content", "children"), Input("url", "pathname"))
 def display_page(pathname):
+    pathname = pathname[len(PATH):] or "/"
     if pathname == "/":
         return get_dashboard_layout()
     elif pathname == "/patients":
@@ -146,62 +147,67 @@ def display_page(pathname):
         return get_placeholder_layout("Settings")
     return get_placeholder_layout("Page Not Found")
 
-# ===== API-Driven Callbacks =====
-@app.callback(Output("active-patient-count", "children"), Input("refresh-interval", "n_intervals"))
-def update_patient_count(_):
-    try:
-        data = requests.get(f"{API}/active_patients").json()
-        return f"{len(data):,}"
-    except:
-        return "0"
-
-@app.callback(
-    Output("appointment-count", "children"),
-    Output("appointment-remaining", "children"),
-    Input("refresh-interval", "n_intervals")
-)
-def update_appointments(_):
-    try:
-        data = requests.get(f"{API}/appointments_today").json()
-        remaining = max(0, 30 - len(data))
-        return str(len(data)), f"{remaining} remaining"
-    except:
-        return "0", "--"
-
-@app.callback(Output("age-group-pie", "figure"), Input("refresh-interval", "n_intervals"))
-def update_age_group_chart(_):
-    try:
-        data = requests.get(f"{API}/age_demographics").json()
-        df = pd.DataFrame(data)
-        fig = px.pie(df, names='age_group', values='count', title='Age Group Distribution', hole=0.3)
-        fig.update_traces(textinfo='percent+label', pull=[0.05]*len(df), hoverinfo='label+percent+value')
-        fig.update_layout(clickmode='event+select')
-        return fig
-    except:
-        return px.pie(title="No data available")
-
-@app.callback(Output("health-trend-chart", "figure"), Input("refresh-interval", "n_intervals"))
-def update_trend_chart(_):
-    try:
-        data = requests.get(f"{API}/monthly_risk_trends").json()
-        df = pd.DataFrame(data)
-        df['month'] = pd.to_datetime(df['month']).dt.strftime('%b')
-        fig = px.bar(df, x='month', y='avg_heart_risk', title='Avg Heart Risk (Monthly)', labels={'avg_heart_risk': 'Avg Heart Risk'}, color='avg_heart_risk')
-        fig.update_traces(marker_line_width=0, hovertemplate='Month: %{x}<br>Avg Risk: %{y:.2f}')
-        fig.update_layout(clickmode='event+select')
-        return fig
-    except:
-        return px.bar(title="No data available")
-
-@app.callback(Output("recent-activity-wrapper", "children"), Input("refresh-interval", "n_intervals"))
-def update_activity_list(_):
-    try:
-        data = requests.get(f"{API}/recent_lab_reports").json()
-        items = [html.Li([html.Strong(f"{r['first_name']} {r['last_name']}"), f" - {r['report_type']} on {r['report_date']}"]) for r in data[:5]]
-        return html.Ul(items, className="list-unstyled")
-    except:
-        return html.Div("No recent activity available")
-
-# ===== Run App =====
-if __name__ == "__main__":
-    app.run(debug=True, port=8050)
+# ===== Callbacks =====
+def register_callbacks(app):
+    # ===== API-Driven Callbacks =====
+    # One backend request per tick; every card and chart reads the stored snapshot
+    @app.callback(Output("frontdesk-snapshot", "data"), Input("frontdesk-refresh-interval", "n_intervals"))
+    def fetch_snapshot(_):
+        try:
+            return api_client.get("/dashboard_snapshot", params={"sections": SNAPSHOT_SECTIONS})
+        except:
+            return None
+
+    @app.callback(Output("frontdesk-active-patient-count", "children"), Input("frontdesk-snapshot", "data"))
+    def update_patient_count(snapshot):
+        try:
+            return f"{snapshot['active_patient_count']:,}"
+        except:
+            return "0"
+
+    @app.callback(
+        Output("frontdesk-appointment-count", "children"),
+        Output("frontdesk-appointment-remaining", "children"),
+        Input("frontdesk-snapshot", "data")
+    )
+    def update_appointments(snapshot):
+        try:
+            count = snapshot["appointments_today_count"]
+            remaining = max(0, 30 - count)
+            return str(count), f"{remaining} remaining"
+        except:
+            return "0", "--"
+
+    @app.callback(Output("frontdesk-age-group-pie", "figure"), Input("frontdesk-snapshot", "data"))
+    def update_age_group_chart(snapshot):
+        try:
+            data = snapshot["age_demographics"]
+            df = pd.DataFrame(data)
+            fig = px.pie(df, names='age_group', values='count', title='Age Group Distribution', hole=0.3)
+            fig.update_traces(textinfo='percent+label', pull=[0.05]*len(df), hoverinfo='label+percent+value')
+            fig.update_layout(clickmode='event+select')
+            return fig
+        except:
+            return px.pie(title="No data available")
+
+    @app.callback(Output("frontdesk-health-trend-chart", "figure"), Input("frontdesk-snapshot", "data"))
+    def update_trend_chart(snapshot):
+        try:
+            data = snapshot["monthly_risk_trends"]
+            df = pd.DataFrame(data)
+            df['month'] = pd.to_datetime(df['month']).dt.strftime('%b')
+            fig = px.bar(df, x='month', y='avg_heart_risk', title='Avg Heart Risk (Monthly)', labels={'avg_heart_risk': 'Avg Heart Risk'}, color='avg_heart_risk')
+            fig.update_traces(marker_line_width=0, hovertemplate='Month: %{x}<br>Avg Risk: %{y:.2f}')
+            fig.update_layout(clickmode='event+select')
+            return fig
+        except:
+            return px.bar(title="No data available")
+
+    @app.callback(Output("frontdesk-recent-activity-wrapper", "children"), Input("frontdesk-snapshot", "data"))
+    def update_activity_list(snapshot):
+        try:
+            data = snapshot["recent_lab_reports"]
+            items = [html.Li([html.Strong(f"{r['first_name']} {r['last_name']}"), f" - {r['report_type']} on {r['report_date']}"]) for r in data[:5]]
+            return html.Ul(items, className="list-unstyled")
+        except:
+            return html.Div("No recent activity available")
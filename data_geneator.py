@@ -1,94 +1,149 @@
 import sqlite3
+import argparse
+import csv
+import json
+import os
+import shutil
+import tempfile
+import time
 from faker import Faker
 import random
-from datetime import datetime, timedelta
+from datetime import datetime, date, timedelta
+from concurrent.futures import ProcessPoolExecutor
+
+from database_setup import create_schema, drop_latest_risk_trigger
+import risk_scoring
 
 fake = Faker()
 
+# Patients are generated in fixed-size blocks, each with its own seed, so the
+# dataset only depends on the seed and never on how blocks are spread over workers.
+BLOCK_SIZE = 1000
+
+# SQLite allows at most 10 attached databases; keep one slot spare.
+MAX_ATTACHED = 9
+
+TABLE_COLUMNS = {
+    "Patients": ("patient_id", "first_name", "last_name", "gender", "date_of_birth", "check_in_status"),
+    "Appointments": ("appointment_id", "patient_id", "appointment_date", "doctor_name", "status"),
+    "LabReports": ("report_id", "patient_id", "report_type", "report_date", "result"),
+    "Vitals": ("vital_id", "patient_id", "record_date", "blood_pressure", "heart_rate",
+               "glucose_level", "bmi", "hemoglobin", "cholesterol"),
+    "RiskScores": ("risk_id", "patient_id", "score_date", "heart_disease_risk", "diabetes_risk"),
+}
+
 def calculate_heart_risk(age, sys, dia, hr, bmi, chol):
-    score = (
-        0.02 * age +
-        0.015 * sys +
-        0.01 * dia +
-        0.02 * hr +
-        0.03 * bmi +
-        0.025 * chol / 10
-    )
-    return round(min(score / 10, 1), 2)
+    return float(risk_scoring.heart_risk(age, sys, dia, hr, bmi, chol))
 
 def calculate_diabetes_risk(age, glucose, bmi, hemo):
-    score = (
-        0.03 * age +
-        0.05 * glucose +
-        0.04 * bmi +
-        -0.02 * hemo
-    )
-    return round(min(score / 15, 1), 2)
-
-def generate_data(n_patients=10000, visits_per_patient=5):
-    conn = sqlite3.connect('healthcare.db')
+    return float(risk_scoring.diabetes_risk(age, glucose, bmi, hemo))
+
+REPORT_TYPES = ['Blood Test', 'X-ray', 'ECG']
+REPORT_RESULTS = ['Normal', 'Abnormal']
+
+def make_vitals(rng):
+    """Draw one visit's vitals (also used by load_driver, so both share the distributions)."""
+    systolic = rng.randint(100, 160)
+    diastolic = rng.randint(60, 100)
+    return {
+        "blood_pressure": f"{systolic}/{diastolic}",
+        "systolic": systolic,
+        "diastolic": diastolic,
+        "heart_rate": rng.randint(60, 100),
+        "glucose": rng.randint(70, 200),
+        "bmi": round(rng.uniform(18.0, 35.0), 1),
+        "hemoglobin": round(rng.uniform(10.0, 17.0), 1),
+        "cholesterol": rng.randint(150, 280),
+    }
+
+def make_patient(fake, rng, now, visits_per_patient):
+    """Draw one synthetic patient and their visits.
+
+    `rng` can be the `random` module or a seeded `random.Random`; `now` is the
+    reference time that ages and visit dates are measured from.
+    """
+    first = fake.first_name()
+    last = fake.last_name()
+    gender = rng.choice(['Male', 'Female'])
+    dob_obj = now.date() - timedelta(days=rng.randint(20 * 365, 85 * 365))
+    age = int((now.date() - dob_obj).days / 365.25)
+    check_in_status = rng.choice(['Checked-in', 'Not Checked-in'])
+    patient = (first, last, gender, dob_obj.isoformat(), check_in_status)
+
+    visits = []
+    for _ in range(visits_per_patient):
+        days_ago = rng.randint(0, 180)
+        visit_date = (now - timedelta(days=days_ago)).isoformat()
+
+        vitals = make_vitals(rng)
+
+        visits.append({
+            "date": visit_date,
+            "doctor": fake.name(),
+            "status": rng.choice(['Scheduled', 'Completed', 'Missed']),
+            "report_type": rng.choice(REPORT_TYPES),
+            "result": rng.choice(REPORT_RESULTS),
+            **vitals,
+            "age": age,
+        })
+    return patient, visits
+
+def add_risk_scores(visits):
+    """Score a list of visit dicts in one vectorized pass (adds heart_risk / diabetes_risk)."""
+    if not visits:
+        return visits
+    scores = risk_scoring.score_vitals({
+        "age": [v["age"] for v in visits],
+        "systolic": [v["systolic"] for v in visits],
+        "diastolic": [v["diastolic"] for v in visits],
+        "heart_rate": [v["heart_rate"] for v in visits],
+        "glucose_level": [v["glucose"] for v in visits],
+        "bmi": [v["bmi"] for v in visits],
+        "hemoglobin": [v["hemoglobin"] for v in visits],
+        "cholesterol": [v["cholesterol"] for v in visits],
+    })
+    for visit, heart, diabetes in zip(visits, scores["heart_disease_risk"].tolist(), scores["diabetes_risk"].tolist()):
+        visit["heart_risk"] = heart
+        visit["diabetes_risk"] = diabetes
+    return visits
+
+def generate_data(n_patients=10000, visits_per_patient=5, db_path='healthcare.db'):
+    conn = sqlite3.connect(db_path)
     cursor = conn.cursor()
 
     for _ in range(n_patients):
-        # Patient info
-        first = fake.first_name()
-        last = fake.last_name()
-        gender = random.choice(['Male', 'Female'])
-        dob_obj = fake.date_of_birth(minimum_age=20, maximum_age=85)
-        dob = dob_obj.isoformat()
-        age = int((datetime.now().date() - dob_obj).days / 365.25)
-        check_in_status = random.choice(['Checked-in', 'Not Checked-in'])
+        patient, visits = make_patient(fake, random, datetime.now(), visits_per_patient)
+        add_risk_scores(visits)
 
         cursor.execute('''
             INSERT INTO Patients (first_name, last_name, gender, date_of_birth, check_in_status)
             VALUES (?, ?, ?, ?, ?)
-        ''', (first, last, gender, dob, check_in_status))
+        ''', patient)
         patient_id = cursor.lastrowid
 
-        for i in range(visits_per_patient):
-            days_ago = random.randint(0, 180)
-            visit_date = (datetime.now() - timedelta(days=days_ago)).isoformat()
-
-            # Appointment
-            doctor = fake.name()
-            status = random.choice(['Scheduled', 'Completed', 'Missed'])
+        for visit in visits:
             cursor.execute('''
                 INSERT INTO Appointments (patient_id, appointment_date, doctor_name, status)
                 VALUES (?, ?, ?, ?)
-            ''', (patient_id, visit_date, doctor, status))
+            ''', (patient_id, visit["date"], visit["doctor"], visit["status"]))
 
-            # Lab Report
-            report_type = random.choice(['Blood Test', 'X-ray', 'ECG'])
-            result = random.choice(['Normal', 'Abnormal'])
             cursor.execute('''
                 INSERT INTO LabReports (patient_id, report_type, report_date, result)
                 VALUES (?, ?, ?, ?)
-            ''', (patient_id, report_type, visit_date, result))
-
-            # Vitals
-            systolic = random.randint(100, 160)
-            diastolic = random.randint(60, 100)
-            bp = f"{systolic}/{diastolic}"
-            hr = random.randint(60, 100)
-            glucose = random.randint(70, 200)
-            bmi = round(random.uniform(18.0, 35.0), 1)
-            hemo = round(random.uniform(10.0, 17.0), 1)
-            chol = random.randint(150, 280)
+            ''', (patient_id, visit["report_type"], visit["date"], visit["result"]))
 
             cursor.execute('''
                 INSERT INTO Vitals (patient_id, record_date, blood_pressure, heart_rate,
                                     glucose_level, bmi, hemoglobin, cholesterol)
                 VALUES (?, ?, ?, ?, ?, ?, ?, ?)
-            ''', (patient_id, visit_date, bp, hr, glucose, bmi, hemo, chol))
+            ''', (patient_id, visit["date"], visit["blood_pressure"], visit["heart_rate"],
+                  visit["glucose"], visit["bmi"], visit["hemoglobin"], visit["cholesterol"]))
 
             # Risk scores - now calculated using logic
-            heart_risk = calculate_heart_risk(age, systolic, diastolic, hr, bmi, chol)
-            diabetes_risk = calculate_diabetes_risk(age, glucose, bmi, hemo)
-
             cursor.execute('''
                 INSERT INTO RiskScores (patient_id, score_date, heart_disease_risk, diabetes_risk)
                 VALUES (?, ?, ?, ?)
-            ''', (patient_id, visit_date, heart_risk, diabetes_risk))
+            ''', (patient_id, visit["date"], visit["heart_risk"], visit["diabetes_risk"]))
 
         if _ % 100 == 0:
             print(f"Inserted {_} patients...")
@@ -97,5 +152,260 @@ def generate_data(n_patients=10000, visits_per_patient=5):
     conn.close()
     print("✅ Data generation complete with realistic risk scores.")
 
+# ---------- Parallel (sharded) generation ----------
+
+def block_seed(seed, block):
+    return seed * 1_000_003 + block
+
+def generate_block(block, seed, n_patients, visits_per_patient, now, id_offsets):
+    """Generate the rows of one patient block, keyed by table name, with explicit IDs."""
+    block_fake = Faker()
+    block_fake.seed_instance(block_seed(seed, block))
+    rng = random.Random(block_seed(seed, block))
+
+    start = block * BLOCK_SIZE
+    stop = min(start + BLOCK_SIZE, n_patients)
+    drawn = [make_patient(block_fake, rng, now, visits_per_patient) for _ in range(start, stop)]
+    add_risk_scores([visit for _, visits in drawn for visit in visits])
+
+    rows = {table: [] for table in TABLE_COLUMNS}
+    for idx, (patient, visits) in enumerate(drawn, start):
+        patient_id = id_offsets["Patients"] + idx + 1
+        rows["Patients"].append((patient_id,) + patient)
+
+        for i, visit in enumerate(visits):
+            visit_no = idx * visits_per_patient + i + 1
+            rows["Appointments"].append((
+                id_offsets["Appointments"] + visit_no, patient_id,
+                visit["date"], visit["doctor"], visit["status"]))
+            rows["LabReports"].append((
+                id_offsets["LabReports"] + visit_no, patient_id,
+                visit["report_type"], visit["date"], visit["result"]))
+            rows["Vitals"].append((
+                id_offsets["Vitals"] + visit_no, patient_id, visit["date"],
+                visit["blood_pressure"], visit["heart_rate"], visit["glucose"],
+                visit["bmi"], visit["hemoglobin"], visit["cholesterol"]))
+            rows["RiskScores"].append((
+                id_offsets["RiskScores"] + visit_no, patient_id, visit["date"],
+                visit["heart_risk"], visit["diabetes_risk"]))
+    return rows
+
+def insert_rows(conn, rows):
+    for table, columns in TABLE_COLUMNS.items():
+        placeholders = ", ".join("?" for _ in columns)
+        conn.executemany(
+            f"INSERT INTO {table} ({', '.join(columns)}) VALUES ({placeholders})",
+            rows[table]
+        )
+
+def _generate_shard(args):
+    shard_path, blocks, seed, n_patients, visits_per_patient, now, id_offsets = args
+    conn = sqlite3.connect(shard_path)
+    conn.execute("PRAGMA journal_mode = OFF")
+    conn.execute("PRAGMA synchronous = OFF")
+    create_schema(conn)
+    drop_latest_risk_trigger(conn)  # merge_shards rebuilds LatestRiskScores for the final database
+    for block in blocks:
+        insert_rows(conn, generate_block(block, seed, n_patients, visits_per_patient, now, id_offsets))
+        conn.commit()
+    conn.close()
+    return shard_path
+
+def get_id_offsets(db_path):
+    """Current max ID per table, so a parallel run appends after existing rows."""
+    offsets = {table: 0 for table in TABLE_COLUMNS}
+    if not os.path.exists(db_path):
+        return offsets
+    conn = sqlite3.connect(db_path)
+    create_schema(conn)
+    for table, columns in TABLE_COLUMNS.items():
+        offsets[table] = conn.execute(f"SELECT COALESCE(MAX({columns[0]}), 0) FROM {table}").fetchone()[0]
+    conn.close()
+    return offsets
+
+def merge_shards(shard_paths, db_path):
+    """Bulk-copy shards into db_path in one transaction, table by table in ID order.
+
+    The insert order (and therefore the file) is the same whatever the shard count.
+    """
+    conn = sqlite3.connect(db_path)
+    create_schema(conn)
+    drop_latest_risk_trigger(conn)
+    for i, path in enumerate(shard_paths):
+        conn.execute(f"ATTACH DATABASE ? AS shard{i}", (path,))
+
+    for table, columns in TABLE_COLUMNS.items():
+        cols = ", ".join(columns)
+        for i in range(len(shard_paths)):
+            conn.execute(f"""
+                INSERT INTO main.{table} ({cols})
+                SELECT {cols} FROM shard{i}.{table} ORDER BY {columns[0]}
+            """)
+    conn.commit()
+
+    for i in range(len(shard_paths)):
+        conn.execute(f"DETACH DATABASE shard{i}")
+    create_schema(conn)  # restores the trigger and rebuilds LatestRiskScores in one pass
+    conn.close()
+
+def fold_shards(shard_paths, work_dir):
+    """Pre-merge neighbouring shards until the final merge fits under MAX_ATTACHED."""
+    level = 0
+    while len(shard_paths) > MAX_ATTACHED:
+        folded = []
+        for i in range(0, len(shard_paths), MAX_ATTACHED):
+            group = shard_paths[i:i + MAX_ATTACHED]
+            path = os.path.join(work_dir, f"fold_{level}_{i // MAX_ATTACHED:05d}.db")
+            merge_shards(group, path)
+            folded.append(path)
+        shard_paths = folded
+        level += 1
+    return shard_paths
+
+def generate_data_parallel(n_patients=10000, visits_per_patient=5, workers=None, seed=42,
+                           reference_date=None, db_path='healthcare.db'):
+    """Generate patients on a process pool, one shard DB per worker, then merge into db_path.
+
+    Patients are seeded per block, so for a given seed and reference date the rows
+    (IDs included) are identical at any worker count.
+    """
+    workers = workers or os.cpu_count() or 1
+    reference_date = reference_date or date.today()
+    now = datetime.combine(reference_date, datetime.min.time())
+    id_offsets = get_id_offsets(db_path)
+
+    n_blocks = (n_patients + BLOCK_SIZE - 1) // BLOCK_SIZE
+    workers = max(1, min(workers, n_blocks))
+    # Contiguous block ranges keep each shard in ID order.
+    per_worker, extra = divmod(n_blocks, workers)
+    ranges = []
+    start = 0
+    for w in range(workers):
+        stop = start + per_worker + (1 if w < extra else 0)
+        ranges.append(range(start, stop))
+        start = stop
+
+    work_dir = tempfile.mkdtemp(prefix="healthcare_shards_", dir=os.path.dirname(os.path.abspath(db_path)))
+    started = time.perf_counter()
+    try:
+        jobs = [
+            (os.path.join(work_dir, f"shard_{w:05d}.db"), blocks, seed, n_patients, visits_per_patient, now, id_offsets)
+            for w, blocks in enumerate(ranges)
+        ]
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            shard_paths = list(pool.map(_generate_shard, jobs))
+        generated = time.perf_counter()
+        print(f"Generated {n_patients} patients in {len(shard_paths)} shards ({generated - started:.1f}s)...")
+
+        merge_shards(fold_shards(shard_paths, work_dir), db_path)
+        print(f"Merged shards into {db_path} ({time.perf_counter() - generated:.1f}s)...")
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+    print(f"✅ Parallel data generation complete: {n_patients} patients, {workers} workers, seed {seed}.")
+
+# ---------- Chunked file export ----------
+
+def write_part(path, columns, rows, fmt):
+    if fmt == "parquet":
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+        data = {column: [row[i] for row in rows] for i, column in enumerate(columns)}
+        pq.write_table(pa.Table.from_pydict(data), path)
+    else:
+        with open(path, "w", newline="") as f:
+            writer = csv.writer(f)
+            writer.writerow(columns)
+            writer.writerows(rows)
+
+def _export_part(args):
+    out_dir, part, blocks, seed, n_patients, visits_per_patient, now, fmt = args
+    rows = {table: [] for table in TABLE_COLUMNS}
+    for block in blocks:
+        for table, block_rows in generate_block(block, seed, n_patients, visits_per_patient, now,
+                                                {table: 0 for table in TABLE_COLUMNS}).items():
+            rows[table].extend(block_rows)
+
+    counts = {}
+    for table, columns in TABLE_COLUMNS.items():
+        write_part(os.path.join(out_dir, table, f"part-{part:05d}.{fmt}"), columns, rows[table], fmt)
+        counts[table] = len(rows[table])
+    return counts
+
+def export_dataset(out_dir, n_patients=10000, visits_per_patient=5, workers=None, seed=42,
+                   reference_date=None, fmt="parquet", part_patients=50 * BLOCK_SIZE):
+    """Write the dataset as one directory of numbered part files per table.
+
+    Each worker holds at most one part (part_patients patients) in memory, so the
+    dataset size is bounded by disk, not RAM. Rows match generate_data_parallel
+    for the same seed and reference date; load them with bulk_loader.py.
+    """
+    if fmt not in ("parquet", "csv"):
+        raise ValueError(f"Unsupported format: {fmt}")
+    if fmt == "parquet":
+        try:
+            import pyarrow  # noqa: F401
+        except ImportError:
+            raise ImportError("Parquet export needs pyarrow (pip install pyarrow), or use --format csv")
+
+    workers = workers or os.cpu_count() or 1
+    reference_date = reference_date or date.today()
+    now = datetime.combine(reference_date, datetime.min.time())
+    for table in TABLE_COLUMNS:
+        os.makedirs(os.path.join(out_dir, table), exist_ok=True)
+
+    blocks_per_part = max(1, part_patients // BLOCK_SIZE)
+    n_blocks = (n_patients + BLOCK_SIZE - 1) // BLOCK_SIZE
+    jobs = [
+        (out_dir, part, range(start, min(start + blocks_per_part, n_blocks)),
+         seed, n_patients, visits_per_patient, now, fmt)
+        for part, start in enumerate(range(0, n_blocks, blocks_per_part))
+    ]
+
+    started = time.perf_counter()
+    totals = {table: 0 for table in TABLE_COLUMNS}
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        for counts in pool.map(_export_part, jobs):
+            for table, count in counts.items():
+                totals[table] += count
+
+    manifest = {
+        "format": fmt,
+        "seed": seed,
+        "reference_date": reference_date.isoformat(),
+        "patients": n_patients,
+        "visits_per_patient": visits_per_patient,
+        "parts": len(jobs),
+        "rows": totals,
+        "columns": {table: list(columns) for table, columns in TABLE_COLUMNS.items()},
+    }
+    with open(os.path.join(out_dir, "manifest.json"), "w") as f:
+        json.dump(manifest, f, indent=2)
+
+    print(f"✅ Exported {totals['Vitals']} visits for {n_patients} patients as {len(jobs)} {fmt} parts "
+          f"to {out_dir} ({time.perf_counter() - started:.1f}s).")
+    return manifest
+
 if __name__ == '__main__':
-    generate_data()
+    parser = argparse.ArgumentParser(description="Generate synthetic healthcare data.")
+    parser.add_argument("--patients", type=int, default=10000)
+    parser.add_argument("--visits", type=int, default=5, help="visits per patient")
+    parser.add_argument("--parallel", action="store_true", help="generate shards on a process pool")
+    parser.add_argument("--workers", type=int, default=None, help="worker processes (default: all cores)")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--reference-date", type=date.fromisoformat, default=None,
+                        help="date ages and visits are measured from (YYYY-MM-DD, default: today)")
+    parser.add_argument("--db", default="healthcare.db")
+    parser.add_argument("--export", metavar="DIR", help="write chunked part files to DIR instead of a database")
+    parser.add_argument("--format", choices=["parquet", "csv"], default="parquet", help="export file format")
+    parser.add_argument("--part-patients", type=int, default=50 * BLOCK_SIZE, help="patients per exported part")
+    args = parser.parse_args()
+
+    if args.export:
+        export_dataset(args.export, args.patients, args.visits, args.workers, args.seed,
+                       args.reference_date, args.format, args.part_patients)
+    elif args.parallel:
+        generate_data_parallel(args.patients, args.visits, args.workers, args.seed,
+                               args.reference_date, args.db)
+    else:
+        generate_data(args.patients, args.visits, args.db)
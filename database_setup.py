@@ -2,8 +2,20 @@
 
 import sqlite3
 
-def create_tables():
-    conn = sqlite3.connect('healthcare.db')
+# Changes that can alter the training matrix (check-in status updates, for one, can't)
+TRAINING_EDIT_EVENTS = [
+    ("Patients", "UPDATE OF patient_id, date_of_birth"), ("Patients", "DELETE"),
+    ("Vitals", "UPDATE"), ("Vitals", "DELETE"),
+    ("RiskScores", "UPDATE"), ("RiskScores", "DELETE"),
+]
+
+# Changes that can alter /latest_risk_snapshot without moving LatestRiskScores' count or max risk_id
+SNAPSHOT_EDIT_EVENTS = [
+    ("Patients", "UPDATE OF patient_id, first_name, last_name, gender"), ("Patients", "DELETE"),
+    ("RiskScores", "UPDATE"), ("RiskScores", "DELETE"),
+]
+
+def create_schema(conn):
     cursor = conn.cursor()
 
     # --- Patients Table ---
@@ -82,7 +94,151 @@ def create_tables():
         )
     ''')
 
+    # --- Rescore Runs Table (progress of batch_rescore.py, updated with each chunk it writes) ---
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS RescoreRuns (
+            run_id INTEGER PRIMARY KEY AUTOINCREMENT,
+            started_at TEXT,
+            score_date TEXT,
+            model_versions TEXT,
+            last_patient_id INTEGER DEFAULT 0,
+            rows_written INTEGER DEFAULT 0,
+            status TEXT,
+            finished_at TEXT
+        )
+    ''')
+
+    # --- Visit indexes (vitals and risk scores of the same visit share patient and date) ---
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_vitals_patient_date ON Vitals(patient_id, record_date)')
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_risk_patient_date ON RiskScores(patient_id, score_date)')
+
+    # --- Latest Risk Scores Table (each patient's newest RiskScores row, kept current by triggers) ---
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS LatestRiskScores (
+            patient_id INTEGER PRIMARY KEY,
+            risk_id INTEGER,
+            score_date TEXT,
+            heart_disease_risk REAL,
+            diabetes_risk REAL,
+            combined_risk REAL GENERATED ALWAYS AS (heart_disease_risk + diabetes_risk) VIRTUAL,
+            FOREIGN KEY(patient_id) REFERENCES Patients(patient_id)
+        )
+    ''')
+    # Databases created before combined_risk existed (virtual columns can be added in place)
+    columns = [row[1] for row in cursor.execute("PRAGMA table_xinfo(LatestRiskScores)")]
+    if "combined_risk" not in columns:
+        cursor.execute('''
+            ALTER TABLE LatestRiskScores
+            ADD COLUMN combined_risk REAL GENERATED ALWAYS AS (heart_disease_risk + diabetes_risk) VIRTUAL
+        ''')
+    # Top-k by combined risk walks this index from the top and stops after k rows
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_latest_combined_risk ON LatestRiskScores(combined_risk)')
+    trigger_exists = cursor.execute(
+        "SELECT 1 FROM sqlite_master WHERE type = 'trigger' AND name = 'trg_latest_risk_score'"
+    ).fetchone()
+    cursor.execute('''
+        CREATE TRIGGER IF NOT EXISTS trg_latest_risk_score AFTER INSERT ON RiskScores
+        BEGIN
+            INSERT INTO LatestRiskScores (patient_id, risk_id, score_date, heart_disease_risk, diabetes_risk)
+            VALUES (NEW.patient_id, NEW.risk_id, NEW.score_date, NEW.heart_disease_risk, NEW.diabetes_risk)
+            ON CONFLICT(patient_id) DO UPDATE SET
+                risk_id = excluded.risk_id,
+                score_date = excluded.score_date,
+                heart_disease_risk = excluded.heart_disease_risk,
+                diabetes_risk = excluded.diabetes_risk
+            WHERE (excluded.score_date, excluded.risk_id) >= (LatestRiskScores.score_date, LatestRiskScores.risk_id);
+        END
+    ''')
+    # Updates and deletes recompute the affected patients' latest row (patient_id itself may change)
+    edit_triggers_exist = cursor.execute(
+        "SELECT 1 FROM sqlite_master WHERE type = 'trigger' AND name = 'trg_latest_risk_score_delete'"
+    ).fetchone()
+    cursor.execute(f'''
+        CREATE TRIGGER IF NOT EXISTS trg_latest_risk_score_update
+        AFTER UPDATE OF patient_id, score_date, heart_disease_risk, diabetes_risk ON RiskScores
+        BEGIN
+            {recompute_latest_risk_score("OLD.patient_id")}
+            {recompute_latest_risk_score("NEW.patient_id")}
+        END
+    ''')
+    cursor.execute(f'''
+        CREATE TRIGGER IF NOT EXISTS trg_latest_risk_score_delete AFTER DELETE ON RiskScores
+        BEGIN
+            {recompute_latest_risk_score("OLD.patient_id")}
+        END
+    ''')
+    # Rows inserted (or edited) while a trigger was missing (older databases, bulk loads) aren't reflected yet
+    if not trigger_exists or not edit_triggers_exist:
+        refresh_latest_risk_scores(conn)
+
+    # --- Training Data Edits (in-place changes to training rows; inserts already show in counts and max IDs) ---
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS TrainingDataEdits (
+            source TEXT PRIMARY KEY,
+            edits INTEGER NOT NULL DEFAULT 0
+        )
+    ''')
+    for table, event in TRAINING_EDIT_EVENTS:
+        cursor.execute(f'''
+            CREATE TRIGGER IF NOT EXISTS trg_edit_{table.lower()}_{event.split()[0].lower()} AFTER {event} ON {table}
+            BEGIN
+                INSERT INTO TrainingDataEdits (source, edits) VALUES ('{table}', 1)
+                ON CONFLICT(source) DO UPDATE SET edits = edits + 1;
+            END
+        ''')
+
+    # --- Snapshot Edits (the same kind of counters, for the latest risk snapshot's version) ---
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS SnapshotEdits (
+            source TEXT PRIMARY KEY,
+            edits INTEGER NOT NULL DEFAULT 0
+        )
+    ''')
+    for table, event in SNAPSHOT_EDIT_EVENTS:
+        cursor.execute(f'''
+            CREATE TRIGGER IF NOT EXISTS trg_snapshot_{table.lower()}_{event.split()[0].lower()} AFTER {event} ON {table}
+            BEGIN
+                INSERT INTO SnapshotEdits (source, edits) VALUES ('{table}', 1)
+                ON CONFLICT(source) DO UPDATE SET edits = edits + 1;
+            END
+        ''')
+
     conn.commit()
+
+def recompute_latest_risk_score(patient_id):
+    """Trigger statements replacing one patient's LatestRiskScores row (patient_id is an SQL expression)."""
+    return f'''
+            DELETE FROM LatestRiskScores WHERE patient_id = {patient_id};
+            INSERT INTO LatestRiskScores (patient_id, risk_id, score_date, heart_disease_risk, diabetes_risk)
+            SELECT patient_id, risk_id, score_date, heart_disease_risk, diabetes_risk
+            FROM RiskScores
+            WHERE patient_id = {patient_id}
+            ORDER BY score_date DESC, risk_id DESC
+            LIMIT 1;'''
+
+def refresh_latest_risk_scores(conn):
+    """Rebuild LatestRiskScores from RiskScores (one index probe per patient)."""
+    conn.execute("DELETE FROM LatestRiskScores")
+    conn.execute('''
+        INSERT INTO LatestRiskScores (patient_id, risk_id, score_date, heart_disease_risk, diabetes_risk)
+        SELECT patient_id, risk_id, score_date, heart_disease_risk, diabetes_risk
+        FROM RiskScores
+        WHERE risk_id IN (
+            SELECT (SELECT risk_id FROM RiskScores r
+                    WHERE r.patient_id = p.patient_id
+                    ORDER BY r.score_date DESC, r.risk_id DESC
+                    LIMIT 1)
+            FROM (SELECT DISTINCT patient_id FROM RiskScores) p
+        )
+    ''')
+
+def drop_latest_risk_trigger(conn):
+    """For bulk loads: skip the per-row trigger, then call create_schema to rebuild LatestRiskScores once."""
+    conn.execute("DROP TRIGGER IF EXISTS trg_latest_risk_score")
+
+def create_tables(db_path='healthcare.db'):
+    conn = sqlite3.connect(db_path)
+    create_schema(conn)
     conn.close()
     print("✅ All tables created successfully.")
 
@@ -0,0 +1,302 @@
+# hyperparameter_search.py
+
+import argparse
+import hashlib
+import json
+import math
+import multiprocessing
+import os
+import queue
+import random
+import signal
+import time
+import warnings
+from concurrent.futures import ProcessPoolExecutor, as_completed, TimeoutError
+
+import numpy as np
+import pandas as pd
+from sklearn.model_selection import KFold, train_test_split
+from sklearn.metrics import r2_score
+from sklearn.exceptions import ConvergenceWarning
+from sklearn.ensemble import RandomForestRegressor, GradientBoostingRegressor
+from sklearn.linear_model import LinearRegression, Ridge, ElasticNet
+from xgboost import XGBRegressor
+
+from risk_scoring import FEATURES
+from train_predictive_model import TARGETS, load_training_data
+
+# family -> (estimator class, search space, fixed params)
+SEARCH_SPACES = {
+    "RandomForest": (RandomForestRegressor, {
+        "n_estimators": [50, 100, 200, 400],
+        "max_depth": [None, 8, 12, 16, 24],
+        "min_samples_leaf": [1, 2, 5, 10],
+        "max_features": [1.0, 0.7, 0.5, "sqrt"],
+    }, {"random_state": 42, "n_jobs": 1}),
+    "GradientBoosting": (GradientBoostingRegressor, {
+        "n_estimators": [100, 200, 400],
+        "learning_rate": [0.03, 0.05, 0.1, 0.2],
+        "max_depth": [2, 3, 4, 6],
+        "subsample": [0.7, 0.85, 1.0],
+    }, {"random_state": 42}),
+    "XGBoost": (XGBRegressor, {
+        "n_estimators": [100, 200, 400, 800],
+        "learning_rate": [0.03, 0.05, 0.1, 0.2],
+        "max_depth": [3, 4, 6, 8],
+        "subsample": [0.7, 0.85, 1.0],
+        "colsample_bytree": [0.6, 0.8, 1.0],
+        "min_child_weight": [1, 5, 10],
+    }, {"random_state": 42, "verbosity": 0, "n_jobs": 1}),
+    "LinearRegression": (LinearRegression, {}, {}),
+    "Ridge": (Ridge, {
+        "alpha": [1e-4, 1e-3, 1e-2, 0.1, 1.0, 10.0],
+    }, {}),
+    "ElasticNet": (ElasticNet, {
+        "alpha": [1e-5, 1e-4, 1e-3, 1e-2],
+        "l1_ratio": [0.1, 0.5, 0.9],
+    }, {"max_iter": 5000}),
+}
+
+# ---------- Candidates ----------
+def sample_candidates(space, n, seed):
+    """Draw up to n distinct parameter sets.
+
+    Draws are sequential from a seeded RNG, so asking for more candidates later
+    keeps the earlier ones and only adds new trials.
+    """
+    rng = random.Random(seed)
+    keys = sorted(space)
+    candidates = []
+    seen = set()
+    for _ in range(n * 20):
+        if len(candidates) >= n:
+            break
+        params = {key: rng.choice(space[key]) for key in keys}
+        key = json.dumps(params, sort_keys=True)
+        if key not in seen:
+            seen.add(key)
+            candidates.append(params)
+    return candidates
+
+def rung_sizes(n_rows, n_candidates, eta, min_samples):
+    """Sample counts per rung; the last rung always uses every training row."""
+    n_rungs = max(1, math.ceil(math.log(max(n_candidates, 1), eta)) + 1)
+    sizes = [int(n_rows / eta ** (n_rungs - 1 - i)) for i in range(n_rungs)]
+    return [size for size in sizes if size >= min_samples] or [n_rows]
+
+# ---------- Fold cache ----------
+class FoldCache:
+    """Append-only JSON-lines store of finished fold scores, so searches can resume."""
+
+    def __init__(self, path):
+        self.path = path
+        self.entries = {}
+        if path and os.path.exists(path):
+            with open(path) as f:
+                for line in f:
+                    if line.strip():
+                        entry = json.loads(line)
+                        self.entries[entry["key"]] = entry
+
+    def get(self, key):
+        return self.entries.get(key)
+
+    def put(self, entry):
+        self.entries[entry["key"]] = entry
+        if self.path:
+            with open(self.path, "a") as f:
+                f.write(json.dumps(entry) + "\n")
+
+def fold_key(data_key, task, family, params, n_samples, fold, n_folds, seed):
+    raw = json.dumps([data_key, task, family, params, n_samples, fold, n_folds, seed], sort_keys=True)
+    return hashlib.sha1(raw.encode()).hexdigest()
+
+def data_fingerprint(X, targets):
+    h = hashlib.sha1()
+    h.update(np.ascontiguousarray(X).tobytes())
+    for task in sorted(targets):
+        h.update(np.ascontiguousarray(targets[task]).tobytes())
+    return h.hexdigest()[:16]
+
+# ---------- Workers ----------
+_DATA = {}
+
+def _init_worker(X, targets, order, worker_pids):
+    warnings.filterwarnings("ignore", category=ConvergenceWarning)
+    worker_pids.put(os.getpid())  # lets run_search stop this worker if the budget runs out
+    _DATA["X"] = X
+    _DATA["targets"] = targets
+    _DATA["order"] = order
+
+def _run_fold(job):
+    task, family, params, n_samples, fold, n_folds, seed = job
+    estimator, _, fixed = SEARCH_SPACES[family]
+    # Rungs use nested prefixes of one fixed shuffle, so larger rungs extend smaller ones
+    rows = _DATA["order"][:n_samples]
+    X = _DATA["X"][rows]
+    y = _DATA["targets"][task][rows]
+    train_idx, valid_idx = list(KFold(n_folds, shuffle=True, random_state=seed).split(X))[fold]
+
+    started = time.perf_counter()
+    model = estimator(**fixed, **params)
+    model.fit(X[train_idx], y[train_idx])
+    score = r2_score(y[valid_idx], model.predict(X[valid_idx]))
+    return {"r2": float(score), "seconds": time.perf_counter() - started}
+
+# ---------- Search ----------
+def run_search(X, targets, families, n_candidates=20, n_folds=3, eta=3, min_samples=2000,
+               budget_s=None, workers=None, seed=42, cache_path="search_cache.jsonl"):
+    """Successive halving per (task, family), all brackets sharing one process pool.
+
+    Every (candidate, fold) fit at every rung is cached; rerunning with the same
+    data and seed reuses them, and a larger n_candidates only adds new trials.
+    When budget_s seconds of search have passed (data loading is not counted),
+    fits still running are abandoned and the best trial of the highest completed
+    rung is reported.
+    """
+    started = time.perf_counter()
+    deadline = started + budget_s if budget_s else None
+    workers = workers or os.cpu_count() or 1
+    cache = FoldCache(cache_path)
+    data_key = data_fingerprint(X, targets)
+    order = np.random.RandomState(seed).permutation(len(X))
+    sizes = rung_sizes(len(X), n_candidates, eta, min_samples)
+
+    # bracket -> surviving candidates and their finished-rung scores
+    brackets = {}
+    for task in targets:
+        for family in families:
+            candidates = sample_candidates(SEARCH_SPACES[family][1], n_candidates, seed)
+            brackets[(task, family)] = {"alive": candidates, "scores": {}, "rung": -1}
+
+    stats = {"fits": 0, "cached": 0, "fit_seconds": 0.0}
+    out_of_time = False
+    worker_pids = multiprocessing.Queue()
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                             initargs=(X, targets, order, worker_pids)) as pool:
+        for rung, n_samples in enumerate(sizes):
+            jobs = {}
+            fold_scores = {}
+            for (task, family), bracket in brackets.items():
+                for params in bracket["alive"]:
+                    pkey = json.dumps(params, sort_keys=True)
+                    fold_scores[(task, family, pkey)] = []
+                    for fold in range(n_folds):
+                        key = fold_key(data_key, task, family, params, n_samples, fold, n_folds, seed)
+                        hit = cache.get(key)
+                        if hit:
+                            fold_scores[(task, family, pkey)].append(hit["r2"])
+                            stats["cached"] += 1
+                        else:
+                            jobs[key] = (task, family, params, n_samples, fold, n_folds, seed)
+
+            futures = {pool.submit(_run_fold, job): (key, job) for key, job in jobs.items()}
+            cached = set()
+            try:
+                remaining = None if deadline is None else max(0.0, deadline - time.perf_counter())
+                for future in as_completed(futures, timeout=remaining):
+                    key, (task, family, params, n, fold, _, _) = futures[future]
+                    result = future.result()
+                    cache.put({"key": key, "task": task, "family": family, "params": params,
+                               "n_samples": n, "fold": fold, **result})
+                    cached.add(key)
+                    fold_scores[(task, family, json.dumps(params, sort_keys=True))].append(result["r2"])
+                    stats["fits"] += 1
+                    stats["fit_seconds"] += result["seconds"]
+            except TimeoutError:
+                out_of_time = True
+                for future in futures:
+                    future.cancel()
+                # Keep folds that finished after the loop stopped waiting for the next run
+                for future, (key, (task, family, params, n, fold, _, _)) in futures.items():
+                    if key in cached or not future.done() or future.cancelled():
+                        continue
+                    if future.exception(timeout=0) is None:
+                        cache.put({"key": key, "task": task, "family": family, "params": params,
+                                   "n_samples": n, "fold": fold, **future.result()})
+                # Fits still running are abandoned: leaving the with block would otherwise wait for them.
+                # A worker running a fit has been initialized, so its pid is already queued.
+                pool.shutdown(wait=False, cancel_futures=True)
+                for _ in range(workers):
+                    try:
+                        pid = worker_pids.get_nowait()
+                    except queue.Empty:
+                        break
+                    try:
+                        os.kill(pid, signal.SIGTERM)
+                    except ProcessLookupError:
+                        pass
+
+            if out_of_time:
+                print(f"⏱️ Budget reached during rung {rung} ({n_samples} samples); "
+                      f"finished folds are cached, running ones were abandoned.")
+                break
+
+            for (task, family), bracket in brackets.items():
+                scored = []
+                for params in bracket["alive"]:
+                    scores = fold_scores[(task, family, json.dumps(params, sort_keys=True))]
+                    scored.append((float(np.mean(scores)), params))
+                scored.sort(key=lambda item: item[0], reverse=True)
+                bracket["scores"] = {"n_samples": n_samples, "ranked": scored}
+                bracket["rung"] = rung
+                bracket["alive"] = [params for _, params in scored[:max(1, math.ceil(len(scored) / eta))]]
+            print(f"Rung {rung}: {n_samples} samples, {len(jobs)} fits, "
+                  f"{time.perf_counter() - started:.1f}s elapsed")
+
+    rows = []
+    for (task, family), bracket in brackets.items():
+        if bracket["rung"] < 0:
+            continue
+        cv_r2, params = bracket["scores"]["ranked"][0]
+        rows.append({"Task": task, "Family": family, "CV R²": round(cv_r2, 4),
+                     "Samples": bracket["scores"]["n_samples"], "Rung": bracket["rung"], "Params": params})
+    results_df = pd.DataFrame(rows)
+    stats["elapsed"] = time.perf_counter() - started
+    stats["complete"] = not out_of_time
+    return results_df, stats
+
+def best_params(results_df):
+    """Nest the results as {task: {family: {"params", "cv_r2"}}} for train_predictive_model --params."""
+    nested = {}
+    for _, row in results_df.iterrows():
+        nested.setdefault(row["Task"], {})[row["Family"]] = {
+            "params": row["Params"], "cv_r2": row["CV R²"], "samples": int(row["Samples"])
+        }
+    return nested
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Cross-validated successive-halving search for the risk models.")
+    parser.add_argument("--families", nargs="+", default=list(SEARCH_SPACES), choices=list(SEARCH_SPACES))
+    parser.add_argument("--candidates", type=int, default=20, help="candidates per model family")
+    parser.add_argument("--folds", type=int, default=3)
+    parser.add_argument("--eta", type=int, default=3, help="keep 1/eta of candidates per rung")
+    parser.add_argument("--min-samples", type=int, default=2000, help="rows used by the first rung")
+    parser.add_argument("--budget", type=float, default=None, help="search time budget in seconds (data loading not counted)")
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--cache", default="search_cache.jsonl", help="fold result cache ('' to disable)")
+    parser.add_argument("--output", default="search_results.json")
+    args = parser.parse_args()
+
+    df = load_training_data()
+    # Keep the same hold-out rows as train_predictive_model out of the search
+    train_df, _ = train_test_split(df, test_size=0.2, random_state=42)
+    X = train_df[FEATURES].to_numpy(dtype=np.float32)
+    targets = {task: train_df[column].to_numpy(dtype=np.float32) for task, column in TARGETS.items()}
+
+    results_df, stats = run_search(X, targets, args.families, args.candidates, args.folds, args.eta,
+                                   args.min_samples, args.budget, args.workers, args.seed, args.cache or None)
+
+    if results_df.empty:
+        print("\n❌ No rung finished within the budget; rerun to resume from the cached folds.")
+    else:
+        print("\n📊 Best Configuration per Model Family:")
+        print(results_df.sort_values(by=["Task", "CV R²"], ascending=[True, False]).to_string(index=False))
+    print(f"\n⏱️ {stats['elapsed']:.1f}s wall, {stats['fits']} new fits ({stats['fit_seconds']:.1f}s of model time), "
+          f"{stats['cached']} folds from cache" + ("" if stats["complete"] else ", stopped by budget"))
+
+    if not results_df.empty:
+        with open(args.output, "w") as f:
+            json.dump(best_params(results_df), f, indent=2)
+        print(f"✅ Best parameters saved to '{args.output}' (use with train_predictive_model.py --params).")
@@ -0,0 +1,304 @@
+# load_driver.py
+
+import argparse
+import json
+import random
+import sqlite3
+import threading
+import time
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, datetime
+
+import numpy as np
+import requests
+
+from data_geneator import (REPORT_TYPES, REPORT_RESULTS, make_vitals,
+                            calculate_heart_risk, calculate_diabetes_risk)
+
+# Read endpoints hit when --read-fraction mixes reads into the write stream
+READ_ENDPOINTS = ["/active_patients", "/appointments_today", "/recent_lab_reports", "/monthly_risk_trends"]
+
+# ---------- Synthetic operations ----------
+class OperationSource:
+    """Draws write operations from the same distributions as data_geneator.
+
+    A visit is a vitals op followed by the risk_score op for the same patient
+    and date, as the training join expects; each op draws only what it sends.
+    birth_dates maps patient_id -> date_of_birth, so risk scores use the
+    patient's real age, as the training query computes it.
+    """
+
+    def __init__(self, birth_dates, read_fraction=0.0, seed=None):
+        self.birth_dates = birth_dates
+        self.patient_ids = sorted(birth_dates)
+        self.read_fraction = read_fraction
+        self.rng = random.Random(seed)
+        self.pending = None  # risk_score op owed for the last vitals op
+
+    def next(self):
+        if self.pending is not None:
+            op, self.pending = self.pending, None
+            return op
+        if self.read_fraction and self.rng.random() < self.read_fraction:
+            return "read", {"path": self.rng.choice(READ_ENDPOINTS)}
+
+        patient_id = self.rng.choice(self.patient_ids)
+        now = datetime.now().isoformat()
+        # A visit emits two ops, so the four write kinds stay equally common
+        kind = self.rng.choice(["check_in", "lab_report", "visit"])
+
+        if kind == "check_in":
+            return kind, {"patient_id": patient_id, "check_in_status": self.rng.choice(['Checked-in', 'Not Checked-in'])}
+        if kind == "lab_report":
+            return kind, {
+                "patient_id": patient_id,
+                "report_type": self.rng.choice(REPORT_TYPES),
+                "report_date": now,
+                "result": self.rng.choice(REPORT_RESULTS),
+            }
+
+        vitals = make_vitals(self.rng)
+        age = int((date.today() - self.birth_dates[patient_id]).days / 365.25)
+        self.pending = ("risk_score", {
+            "patient_id": patient_id,
+            "score_date": now,
+            "heart_disease_risk": calculate_heart_risk(age, vitals["systolic"], vitals["diastolic"],
+                                                       vitals["heart_rate"], vitals["bmi"], vitals["cholesterol"]),
+            "diabetes_risk": calculate_diabetes_risk(age, vitals["glucose"], vitals["bmi"], vitals["hemoglobin"]),
+        })
+        return "vitals", {
+            "patient_id": patient_id,
+            "record_date": now,
+            "blood_pressure": vitals["blood_pressure"],
+            "heart_rate": vitals["heart_rate"],
+            "glucose_level": vitals["glucose"],
+            "bmi": vitals["bmi"],
+            "hemoglobin": vitals["hemoglobin"],
+            "cholesterol": vitals["cholesterol"],
+        }
+
+    def flush(self):
+        """Operations still owed (the risk_score op of a visit cut off after its vitals)."""
+        ops = [] if self.pending is None else [self.pending]
+        self.pending = None
+        return ops
+
+# ---------- Targets ----------
+class HttpTarget:
+    PATHS = {
+        "check_in": "/check_in",
+        "vitals": "/save_vitals",
+        "lab_report": "/save_lab_report",
+        "risk_score": "/save_risk",
+    }
+
+    def __init__(self, api, timeout=10):
+        self.api = api
+        self.timeout = timeout
+        self.local = threading.local()
+
+    def _session(self):
+        if not hasattr(self.local, "session"):
+            self.local.session = requests.Session()
+        return self.local.session
+
+    def send(self, kind, payload):
+        session = self._session()
+        if kind == "read":
+            response = session.get(f"{self.api}{payload['path']}", timeout=self.timeout)
+            response.raise_for_status()
+            return
+        response = session.post(f"{self.api}{self.PATHS[kind]}", json=payload, timeout=self.timeout)
+        response.raise_for_status()
+        body = response.json()
+        if body.get("status") == "error":
+            raise RuntimeError(body.get("message"))
+
+class SqliteTarget:
+    """Writes straight into SQLite with the same statements as the backend."""
+
+    def __init__(self, db_path):
+        self.db_path = db_path
+        self.local = threading.local()
+
+    def _conn(self):
+        if not hasattr(self.local, "conn"):
+            self.local.conn = sqlite3.connect(self.db_path, timeout=30, check_same_thread=False)
+        return self.local.conn
+
+    def send(self, kind, payload):
+        conn = self._conn()
+        if kind == "read":
+            raise RuntimeError("reads need the HTTP target")
+        if kind == "check_in":
+            cursor = conn.execute("UPDATE Patients SET check_in_status = ? WHERE patient_id = ?",
+                                  (payload["check_in_status"], payload["patient_id"]))
+            if cursor.rowcount == 0:
+                conn.rollback()
+                raise RuntimeError("Invalid patient_id. Patient not found.")
+        elif kind == "vitals":
+            conn.execute("""
+                INSERT INTO Vitals (patient_id, record_date, blood_pressure, heart_rate,
+                                    glucose_level, bmi, hemoglobin, cholesterol)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+            """, (payload["patient_id"], payload["record_date"], payload["blood_pressure"], payload["heart_rate"],
+                  payload["glucose_level"], payload["bmi"], payload["hemoglobin"], payload["cholesterol"]))
+        elif kind == "lab_report":
+            conn.execute("""
+                INSERT INTO LabReports (patient_id, report_type, report_date, result)
+                VALUES (?, ?, ?, ?)
+            """, (payload["patient_id"], payload["report_type"], payload["report_date"], payload["result"]))
+        else:
+            conn.execute("""
+                INSERT INTO RiskScores (patient_id, score_date, heart_disease_risk, diabetes_risk)
+                VALUES (?, ?, ?, ?)
+            """, (payload["patient_id"], payload["score_date"], payload["heart_disease_risk"], payload["diabetes_risk"]))
+        conn.commit()
+
+# ---------- Stats ----------
+class LoadStats:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.latencies = defaultdict(list)
+        self.errors = defaultdict(int)
+        self.error_samples = {}
+
+    def record(self, kind, latency, error=None):
+        with self.lock:
+            self.latencies[kind].append(latency)
+            if error is not None:
+                self.errors[kind] += 1
+                self.error_samples.setdefault(kind, str(error))
+
+    def summary(self, elapsed):
+        with self.lock:
+            rows = {}
+            for kind, values in sorted(self.latencies.items()):
+                ms = np.asarray(values) * 1000
+                rows[kind] = {
+                    "count": len(values),
+                    "errors": self.errors[kind],
+                    "rate": round(len(values) / elapsed, 1),
+                    "p50_ms": round(float(np.percentile(ms, 50)), 2),
+                    "p95_ms": round(float(np.percentile(ms, 95)), 2),
+                    "p99_ms": round(float(np.percentile(ms, 99)), 2),
+                }
+            total = sum(len(v) for v in self.latencies.values())
+            return {
+                "elapsed_s": round(elapsed, 2),
+                "operations": total,
+                "errors": sum(self.errors.values()),
+                "achieved_rate": round(total / elapsed, 1) if elapsed else 0.0,
+                "by_kind": rows,
+                "error_samples": dict(self.error_samples),
+            }
+
+# ---------- Driver ----------
+def run_load(target, source, rate, concurrency, duration, report_every=5.0):
+    """Open-loop load: operation i is due at start + i / rate.
+
+    Latency is measured from the due time, so a saturated target shows up as
+    queueing delay rather than a silently lower offered rate. At most
+    2 * concurrency operations are in flight; beyond that the driver falls behind
+    and the achieved rate drops below the target. When the run ends (or is
+    interrupted), a visit's pending risk_score op is still sent.
+    """
+    stats = LoadStats()
+    in_flight = threading.BoundedSemaphore(concurrency * 2)
+
+    def execute(kind, payload, due):
+        try:
+            target.send(kind, payload)
+            stats.record(kind, time.perf_counter() - due)
+        except Exception as e:
+            stats.record(kind, time.perf_counter() - due, e)
+        finally:
+            in_flight.release()
+
+    start = time.perf_counter()
+    next_report = start + report_every
+    i = 0
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        try:
+            while True:
+                due = start + i / rate
+                now = time.perf_counter()
+                if due - start >= duration:
+                    break
+                if due > now:
+                    time.sleep(due - now)
+                kind, payload = source.next()
+                in_flight.acquire()
+                pool.submit(execute, kind, payload, due)
+                i += 1
+
+                if time.perf_counter() >= next_report:
+                    snapshot = stats.summary(time.perf_counter() - start)
+                    print(f"[{snapshot['elapsed_s']:>6.1f}s] {snapshot['operations']} ops, "
+                          f"{snapshot['achieved_rate']}/s, {snapshot['errors']} errors")
+                    next_report += report_every
+        except KeyboardInterrupt:
+            print("Interrupted; finishing in-flight operations...")
+
+        # Don't leave a vitals row without its same-visit risk score
+        for kind, payload in source.flush():
+            in_flight.acquire()
+            pool.submit(execute, kind, payload, time.perf_counter())
+
+    return stats.summary(time.perf_counter() - start)
+
+def birth_dates_from_db(db_path, max_patient_id=None):
+    """patient_id -> date_of_birth for every patient with a valid date of birth."""
+    conn = sqlite3.connect(db_path)
+    rows = conn.execute("SELECT patient_id, date_of_birth FROM Patients").fetchall()
+    conn.close()
+    birth_dates = {}
+    for patient_id, date_of_birth in rows:
+        if max_patient_id is not None and patient_id > max_patient_id:
+            continue
+        try:
+            birth_dates[patient_id] = date.fromisoformat(date_of_birth[:10])
+        except (TypeError, ValueError):
+            continue
+    return birth_dates
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Stream synthetic check-ins, vitals, lab reports and risk scores.")
+    parser.add_argument("--target", choices=["http", "sqlite"], default="http")
+    parser.add_argument("--api", default="http://localhost:8000")
+    parser.add_argument("--db", default="healthcare.db", help="patients (and their ages) are read from here")
+    parser.add_argument("--rate", type=float, default=50.0, help="target operations per second")
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--duration", type=float, default=60.0, help="seconds")
+    parser.add_argument("--read-fraction", type=float, default=0.0,
+                        help="share of operations that are GETs against read endpoints (http only)")
+    parser.add_argument("--max-patient-id", type=int, default=None, help="only drive patients up to this ID")
+    parser.add_argument("--seed", type=int, default=None)
+    parser.add_argument("--json", metavar="PATH", help="write the final summary as JSON")
+    args = parser.parse_args()
+
+    if args.target == "sqlite" and args.read_fraction:
+        parser.error("--read-fraction needs --target http")
+
+    birth_dates = birth_dates_from_db(args.db, args.max_patient_id)
+    if not birth_dates:
+        parser.error(f"no patients with a date of birth in {args.db}")
+    target = HttpTarget(args.api) if args.target == "http" else SqliteTarget(args.db)
+    source = OperationSource(birth_dates, args.read_fraction, args.seed)
+
+    print(f"Driving {args.rate}/s for {args.duration}s at concurrency {args.concurrency} ({args.target})...")
+    summary = run_load(target, source, args.rate, args.concurrency, args.duration)
+
+    print("\n📊 Load Summary:")
+    print(f"Achieved {summary['achieved_rate']}/s of {args.rate}/s target, "
+          f"{summary['operations']} operations, {summary['errors']} errors")
+    for kind, row in summary["by_kind"].items():
+        print(f"  {kind:<11} n={row['count']:<7} err={row['errors']:<5} "
+              f"p50={row['p50_ms']}ms p95={row['p95_ms']}ms p99={row['p99_ms']}ms")
+    for kind, message in summary["error_samples"].items():
+        print(f"  ❌ {kind}: {message}")
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(summary, f, indent=2)
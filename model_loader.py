@@ -0,0 +1,150 @@
+# model_loader.py
+
+import os
+import threading
+import time
+
+import joblib
+import numpy as np
+import pandas as pd
+
+import model_registry
+from risk_scoring import FEATURES, split_blood_pressure
+
+# Fallback artifacts for when the registry has no versions yet
+MODEL_FILES = {
+    "heart": "heart_risk_model.pkl",
+    "diabetes": "diabetes_risk_model.pkl",
+}
+
+# Registry-only model predicting both risks at once (train_predictive_model.py --multi-output);
+# used instead of the separate models whenever it has a live version
+MULTI_OUTPUT = "risk"
+
+# How often a serving process checks the registry for a newly promoted version
+POLL_INTERVAL_S = float(os.environ.get("MODEL_POLL_INTERVAL", "5"))
+
+_models = {}       # name -> (version, model); replaced as a whole, never mutated
+_checked_at = {}   # name -> last registry poll time
+_load_stats = {}
+_locks = {name: threading.Lock() for name in [*MODEL_FILES, MULTI_OUTPUT]}
+
+# ---------- Memory helpers ----------
+def _mapped_bytes(obj, seen=None, depth=0):
+    """Bytes of np.memmap-backed arrays reachable from obj (what worker processes can share)."""
+    seen = set() if seen is None else seen
+    if id(obj) in seen or depth > 6:
+        return 0
+    seen.add(id(obj))
+    if isinstance(obj, np.ndarray):
+        base = obj
+        while base is not None and not isinstance(base, np.memmap):
+            base = base.base if isinstance(base.base, np.ndarray) else None
+        return obj.nbytes if base is not None else 0
+    if isinstance(obj, dict):
+        return sum(_mapped_bytes(v, seen, depth + 1) for v in obj.values())
+    if isinstance(obj, (list, tuple)):
+        return sum(_mapped_bytes(v, seen, depth + 1) for v in obj)
+    if hasattr(obj, "__dict__"):
+        return _mapped_bytes(vars(obj), seen, depth + 1)
+    return 0
+
+# ---------- Lazy loading / hot reload ----------
+def _load(name, version):
+    rss_before = model_registry.rss_bytes()
+    started = time.perf_counter()
+    # Uncompressed joblib files keep numpy arrays raw on disk, so mmap_mode lets
+    # every worker process map the same pages instead of holding a private copy.
+    if version is None and name not in MODEL_FILES:
+        return None
+    if version is None:
+        path = MODEL_FILES[name]
+        model = joblib.load(path, mmap_mode="r")
+    else:
+        # Single-patient lookups are what this module serves, so use the compiled
+        # tree predictor when training produced one
+        path = model_registry.artifact_path(name, version, compiled=True)
+        _, model, _ = model_registry.load(name, version, compiled=True)
+    load_ms = (time.perf_counter() - started) * 1000
+    rss_after = model_registry.rss_bytes()
+
+    _load_stats[name] = {
+        "model": name,
+        "version": version or "legacy",
+        "path": path,
+        "type": type(model).__name__,
+        "file_mb": round(os.path.getsize(path) / 1e6, 2),
+        "load_ms": round(load_ms, 1),
+        "rss_delta_mb": round((rss_after - rss_before) / 1e6, 2) if rss_before is not None else None,
+        "mmapped_mb": round(_mapped_bytes(model) / 1e6, 2),
+        "pid": os.getpid(),
+    }
+    return model
+
+def get_model(name):
+    """Return the live model, loading it on first use and following registry promotions.
+
+    Returns None for a registry-only model (MULTI_OUTPUT) that has no live version.
+
+    At most every POLL_INTERVAL_S the registry's CURRENT pointer is re-read. A new
+    version is loaded by one thread while the others keep serving the old one; the
+    swap is a single reference assignment, so a request sees either the old or the
+    new model, and the old one is freed once the last request using it finishes.
+    """
+    loaded = _models.get(name)
+    now = time.monotonic()
+    if loaded is not None and now - _checked_at.get(name, 0) < POLL_INTERVAL_S:
+        return loaded[1]
+
+    lock = _locks[name]
+    # Someone else is already loading: keep serving what we have
+    if not lock.acquire(blocking=loaded is None):
+        return loaded[1]
+    try:
+        loaded = _models.get(name)
+        _checked_at[name] = time.monotonic()
+        version = model_registry.current_version(name)
+        if loaded is None or loaded[0] != version:
+            _models[name] = loaded = (version, _load(name, version))
+        return loaded[1]
+    finally:
+        lock.release()
+
+def current_versions():
+    return {name: loaded[0] or "legacy" for name, loaded in _models.items() if loaded[1] is not None}
+
+def load_report():
+    """Load time and memory per artifact loaded so far in this process."""
+    return [dict(stats) for stats in _load_stats.values()]
+
+# ---------- Prediction helpers ----------
+def vitals_to_features(age, vitals):
+    """One feature row (in training column order) from a Vitals record and the patient's age."""
+    systolic, diastolic = split_blood_pressure([vitals["blood_pressure"]])
+    row = {
+        "age": age,
+        "systolic": systolic[0],
+        "diastolic": diastolic[0],
+        "heart_rate": vitals["heart_rate"],
+        "glucose_level": vitals["glucose_level"],
+        "bmi": vitals["bmi"],
+        "hemoglobin": vitals["hemoglobin"],
+        "cholesterol": vitals["cholesterol"],
+    }
+    return pd.DataFrame([row], columns=FEATURES)
+
+def predict_risk(features):
+    """Heart and diabetes model predictions for a feature frame, clipped to [0, 1]."""
+    combined = get_model(MULTI_OUTPUT)
+    if combined is not None:
+        both = np.clip(combined.predict(features), 0, 1)
+        return both[:, 0], both[:, 1]
+    heart = np.clip(get_model("heart").predict(features), 0, 1)
+    diabetes = np.clip(get_model("diabetes").predict(features), 0, 1)
+    return heart, diabetes
+
+if __name__ == "__main__":
+    for name in MODEL_FILES:
+        get_model(name)
+    print("\n📦 Model Load Report:")
+    print(pd.DataFrame(load_report()).to_string(index=False))
@@ -0,0 +1,210 @@
+# model_registry.py
+
+import argparse
+import inspect
+import io
+import json
+import os
+import pickle
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+import joblib
+import numpy as np
+
+REGISTRY_DIR = os.environ.get("MODEL_REGISTRY", "model_registry")
+
+# Layout: <registry>/<name>/v0001/{model.pkl, meta.json[, compiled.pkl]} and
+# <registry>/<name>/CURRENT holding the live version. compiled.pkl is an optional
+# low-latency predictor (tree_compiler.py) for the same model. Versions are immutable once written; serving processes
+# only ever follow CURRENT, which is replaced atomically.
+
+def _name_dir(name, registry_dir=REGISTRY_DIR):
+    return os.path.join(registry_dir, name)
+
+def list_versions(name, registry_dir=REGISTRY_DIR):
+    path = _name_dir(name, registry_dir)
+    if not os.path.isdir(path):
+        return []
+    return sorted(v for v in os.listdir(path) if v.startswith("v") and v[1:].isdigit())
+
+def current_version(name, registry_dir=REGISTRY_DIR):
+    try:
+        with open(os.path.join(_name_dir(name, registry_dir), "CURRENT")) as f:
+            return f.read().strip() or None
+    except FileNotFoundError:
+        return None
+
+def promote(name, version, registry_dir=REGISTRY_DIR):
+    """Point CURRENT at an existing version (also used to roll back)."""
+    if version not in list_versions(name, registry_dir):
+        raise ValueError(f"Unknown version {version} for model '{name}'")
+    pointer = os.path.join(_name_dir(name, registry_dir), "CURRENT")
+    with open(pointer + ".tmp", "w") as f:
+        f.write(version)
+    os.replace(pointer + ".tmp", pointer)
+
+def retire(name, registry_dir=REGISTRY_DIR):
+    """Take a model out of service; its versions stay on disk and can be promoted again."""
+    try:
+        os.remove(os.path.join(_name_dir(name, registry_dir), "CURRENT"))
+    except FileNotFoundError:
+        pass
+
+def register(name, model, meta, registry_dir=REGISTRY_DIR, make_current=True, compiled=None):
+    """Store model + metadata (+ compiled predictor) as the next version; optionally make it the live one."""
+    os.makedirs(_name_dir(name, registry_dir), exist_ok=True)
+    versions = list_versions(name, registry_dir)
+    version = f"v{int(versions[-1][1:]) + 1:04d}" if versions else "v0001"
+
+    # Build the version in a scratch directory and rename it into place in one step
+    staging = os.path.join(_name_dir(name, registry_dir), f".{version}.tmp")
+    shutil.rmtree(staging, ignore_errors=True)
+    os.makedirs(staging)
+    joblib.dump(model, os.path.join(staging, "model.pkl"))
+    if compiled is not None:
+        joblib.dump(compiled, os.path.join(staging, "compiled.pkl"))
+    meta = dict(meta, name=name, version=version, registered_at=datetime.now().isoformat())
+    with open(os.path.join(staging, "meta.json"), "w") as f:
+        json.dump(meta, f, indent=2)
+    os.rename(staging, os.path.join(_name_dir(name, registry_dir), version))
+
+    if make_current:
+        promote(name, version, registry_dir)
+    return version
+
+def load_meta(name, version=None, registry_dir=REGISTRY_DIR):
+    version = version or current_version(name, registry_dir)
+    with open(os.path.join(_name_dir(name, registry_dir), version, "meta.json")) as f:
+        return json.load(f)
+
+def artifact_path(name, version, registry_dir=REGISTRY_DIR, compiled=False):
+    """Path of the predictor to load; compiled=True prefers compiled.pkl when the version has one."""
+    path = os.path.join(_name_dir(name, registry_dir), version, "compiled.pkl")
+    if compiled and os.path.exists(path):
+        return path
+    return os.path.join(_name_dir(name, registry_dir), version, "model.pkl")
+
+def load(name, version=None, registry_dir=REGISTRY_DIR, mmap_mode="r", compiled=False):
+    """Return (version, model, meta) for a version (default: CURRENT)."""
+    version = version or current_version(name, registry_dir)
+    if version is None:
+        raise FileNotFoundError(f"No registered versions of model '{name}' in {registry_dir}")
+    model = joblib.load(artifact_path(name, version, registry_dir, compiled), mmap_mode=mmap_mode)
+    return version, model, load_meta(name, version, registry_dir)
+
+def rss_bytes():
+    try:
+        import psutil
+        return psutil.Process().memory_info().rss
+    except ImportError:
+        pass
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError):
+        return None
+
+def _time_predict(model, X, min_time=0.2, max_repeats=50):
+    """Median seconds per predict call, repeating until min_time has been spent."""
+    model.predict(X)
+    timings = []
+    while len(timings) < 3 or (sum(timings) < min_time and len(timings) < max_repeats):
+        started = time.perf_counter()
+        model.predict(X)
+        timings.append(time.perf_counter() - started)
+    return float(np.median(timings))
+
+# Run in a fresh interpreter: the modules the pickle needs are imported first, so
+# the RSS growth across joblib.load is the unpickled model alone
+_LOAD_PROBE = """
+import importlib, sys
+import joblib
+from model_registry import rss_bytes
+for module in sys.argv[2:]:
+    importlib.import_module(module)
+before = rss_bytes()
+model = joblib.load(sys.argv[1])
+after = rss_bytes()
+print(after - before if before is not None and after is not None else "")
+"""
+
+def _pickled_modules(model):
+    """Modules whose classes and functions appear in the model's pickle."""
+    modules = set()
+
+    class Recorder(pickle.Pickler):
+        def persistent_id(self, obj):
+            owner = obj if isinstance(obj, type) or inspect.isroutine(obj) else type(obj)
+            modules.add(getattr(owner, "__module__", None))
+            return None
+
+    Recorder(io.BytesIO(), protocol=pickle.HIGHEST_PROTOCOL).dump(model)
+    return sorted(m for m in modules if m and m in sys.modules and m not in ("builtins", "__main__"))
+
+def loaded_bytes(path, modules):
+    """RSS a fresh process gains unpickling the model at path (None if RSS can't be read)."""
+    here = os.path.dirname(os.path.abspath(__file__))
+    result = subprocess.run([sys.executable, "-c", _LOAD_PROBE, os.path.abspath(path), *modules],
+                            cwd=here, capture_output=True, text=True, check=True)
+    output = result.stdout.strip()
+    return int(output) if output else None
+
+def benchmark_inference(model, X, batch_sizes=(1, 100, 10_000)):
+    """Serving cost of a fitted model: predict latency per batch size, throughput,
+    serialized size and the memory its unpickled form takes in a fresh process."""
+    buffer = io.BytesIO()
+    joblib.dump(model, buffer)
+    # Measured in a child process: in this long-lived one, freed pages from earlier
+    # loads are reused and the figure depends on what was loaded before
+    with tempfile.NamedTemporaryFile(suffix=".pkl", delete=False) as f:
+        f.write(buffer.getbuffer())
+    try:
+        load_bytes = loaded_bytes(f.name, _pickled_modules(model))
+    finally:
+        os.remove(f.name)
+
+    # Tile the sample so every batch size gets real rows
+    batch_ms = {}
+    for size in batch_sizes:
+        batch = X.iloc[np.arange(size) % len(X)] if hasattr(X, "iloc") else X[np.arange(size) % len(X)]
+        batch_ms[str(size)] = round(_time_predict(model, batch) * 1000, 4)
+    largest = max(batch_sizes)
+    return {
+        "single_row_ms": batch_ms[str(min(batch_sizes))],
+        "batch_ms": batch_ms,
+        "rows_per_s": round(largest / max(batch_ms[str(largest)] / 1000, 1e-9)),
+        "artifact_mb": round(buffer.getbuffer().nbytes / 1e6, 3),
+        "loaded_mb": round(load_bytes / 1e6, 3) if load_bytes is not None else None,
+    }
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Inspect or roll back registered models.")
+    parser.add_argument("name", nargs="?", help="model name (e.g. heart, diabetes)")
+    parser.add_argument("--promote", metavar="VERSION", help="make VERSION the live model")
+    args = parser.parse_args()
+
+    if args.name:
+        names = [args.name]
+    elif os.path.isdir(REGISTRY_DIR):
+        names = sorted(d for d in os.listdir(REGISTRY_DIR) if os.path.isdir(os.path.join(REGISTRY_DIR, d)))
+    else:
+        names = []
+
+    if args.promote:
+        promote(args.name, args.promote)
+        print(f"✅ {args.name} → {args.promote}")
+    for name in names:
+        live = current_version(name)
+        print(f"\n📦 {name}")
+        for version in list_versions(name):
+            meta = load_meta(name, version)
+            metrics = meta.get("metrics", {})
+            inference = meta.get("inference", {})
+            print(f"  {'*' if version == live else ' '} {version}  {meta.get('model', '?'):<17} "
+                  f"R²={metrics.get('r2', '?')}  hwm={meta.get('high_water_mark')}  "
+                  f"{inference.get('single_row_ms', '?')} ms/row  {inference.get('artifact_mb', '?')} MB  {meta.get('registered_at', '')[:19]}")
@@ -1,16 +1,18 @@
 # nurse_portal.py
 
-import dash
+import json
+
 from dash import html, dcc, Input, Output, State
 import dash_bootstrap_components as dbc
 import pandas as pd
-import plotly.express as px
-import requests
+import api_client
+import risk_charts
+import tables
 
-# Initialize app
-app = dash.Dash(__name__, external_stylesheets=[dbc.themes.LUX], suppress_callback_exceptions=True)
-server = app.server
-API = "http://localhost:8000"
+# Served by app.py under PATH; sub-pages live at PATH + "/patients" etc.
+PATH = "/nurse_dashboard"
+# The /dashboard_snapshot sections this page renders
+SNAPSHOT_SECTIONS = "active_patient_count,recent_lab_reports"
 
 # ======= Layout =======
 
@@ -22,11 +24,11 @@ sidebar = html.Div([
     ], className="text-center"),
 
     dbc.Nav([
-        dbc.NavLink("🏥 Dashboard", href="/", active="exact"),
-        dbc.NavLink("📋 Patients", href="/patients", active="exact"),
-        dbc.NavLink("🧪 Lab Reports", href="/labs", active="exact"),
-        dbc.NavLink("❤️ Vitals", href="/vitals", active="exact"),
-        dbc.NavLink("⚙️ Settings", href="/settings", active="exact"),
+        dbc.NavLink("🏥 Dashboard", href=PATH, active="exact"),
+        dbc.NavLink("📋 Patients", href=PATH + "/patients", active="exact"),
+        dbc.NavLink("🧪 Lab Reports", href=PATH + "/labs", active="exact"),
+        dbc.NavLink("❤️ Vitals", href=PATH + "/vitals", active="exact"),
+        dbc.NavLink("⚙️ Settings", href=PATH + "/settings", active="exact"),
     ], vertical=True, pills=True)
 ], style={
     "backgroundColor": "#f8f9fa",
@@ -52,75 +54,75 @@ header = dbc.Navbar(
 )
 
 # Main layout
-app.layout = html.Div([
-    dcc.Location(id="url"),
-    sidebar,
-    header,
-    html.Div(id="page-content", style={"marginLeft": "16%", "padding": "30px"})
-])
+def layout(pathname=PATH):
+    return html.Div([
+        sidebar,
+        header,
+        html.Div(display_page(pathname), style={"marginLeft": "16%", "padding": "30px"})
+    ])
 
 # ======= Pages =======
 
 def dashboard_page():
     return html.Div([
         html.H3("Today's Overview", className="mb-4 fw-bold"),
+        dcc.Interval(id="nurse-refresh-labs", interval=10*1000, n_intervals=0),
+        dcc.Store(id="nurse-snapshot"),
 
         dbc.Row([
             dbc.Col(dbc.Card([
                 dbc.CardBody([
                     html.H6("Active Patients"),
-                    html.H2(id="active-patient-count", className="text-primary fw-bold")
+                    html.H2(id="nurse-active-patient-count", className="text-primary fw-bold")
                 ])
             ], className="shadow-sm p-3 bg-light"), width=6),
 
             dbc.Col(dbc.Card([
                 dbc.CardBody([
                     html.H6("New Lab Reports (Last 7 days)"),
-                    html.H2(id="lab-report-count", className="text-danger fw-bold")
+                    html.H2(id="nurse-lab-report-count", className="text-danger fw-bold")
                 ])
             ], className="shadow-sm p-3 bg-light"), width=6)
         ])
     ])
 
 def patients_page():
-    try:
-        data = requests.get(f"{API}/active_patients").json()
-        if not data:
-            return html.Div("No active patients found.")
-        table = dbc.Table.from_dataframe(pd.DataFrame(data)[['first_name', 'last_name', 'gender', 'date_of_birth']], striped=True, bordered=True, hover=True)
-        return html.Div([
-            html.H4("Checked-in Patients"),
-            table
+    # Rows are fetched a page at a time by page_patients_table below
+    return html.Div([
+        html.H4("Checked-in Patients"),
+        tables.paged_table("nurse-patients-table", [
+            ("first_name", "First Name"),
+            ("last_name", "Last Name"),
+            ("gender", "Gender"),
+            ("date_of_birth", "Date of Birth"),
         ])
-    except:
-        return html.Div("Error loading patient data.")
+    ])
 
 def labs_page():
     return html.Div([
         html.H4("Recent Lab Reports", className="mb-4 fw-bold"),
-        dcc.Interval(id="refresh-labs", interval=10*1000, n_intervals=0),
-        html.Div(id="lab-reports-list"),
+        dcc.Interval(id="nurse-refresh-labs", interval=10*1000, n_intervals=0),
+        dcc.Store(id="nurse-snapshot"),
+        html.Div(id="nurse-lab-reports-list"),
         html.Hr(),
         html.H4("Add New Lab Report"),
         dbc.Form([
             dbc.Row([
-                dbc.Col(dbc.Input(id="patient-id", placeholder="Patient ID", type="number"), width=4),
-                dbc.Col(dbc.Input(id="report-type", placeholder="Report Type (e.g., Blood Test)", type="text"), width=4),
-                dbc.Col(dbc.Input(id="report-result", placeholder="Result (Normal/Abnormal)", type="text"), width=4)
+                dbc.Col(dbc.Input(id="nurse-patient-id", placeholder="Patient ID", type="number"), width=4),
+                dbc.Col(dbc.Input(id="nurse-report-type", placeholder="Report Type (e.g., Blood Test)", type="text"), width=4),
+                dbc.Col(dbc.Input(id="nurse-report-result", placeholder="Result (Normal/Abnormal)", type="text"), width=4)
             ], className="mb-3"),
-            dbc.Button("Submit Lab Report", id="submit-lab-btn", color="success"),
-            html.Div(id="submit-status", className="mt-3")
+            dbc.Button("Submit Lab Report", id="nurse-submit-lab-btn", color="success"),
+            html.Div(id="nurse-submit-status", className="mt-3")
         ])
     ])
 
 def vitals_page():
     try:
-        data = requests.get(f"{API}/risk_scores").json()
-        if not data:
+        data = api_client.get("/risk_series", params={"max_points": risk_charts.MAX_POINTS})
+        if not data["total_points"]:
             return html.Div("No vitals data found.")
-        df = pd.DataFrame(data)
-        fig = px.line(df, x="score_date", y=["heart_disease_risk", "diabetes_risk"], markers=True, title="Vitals Risk Score Trends")
-        return dcc.Graph(figure=fig)
+        return dcc.Graph(figure=risk_charts.risk_series_figure(data, "Vitals Risk Score Trends"))
     except:
         return html.Div("Error loading vitals data.")
 
@@ -132,8 +134,8 @@ def settings_page():
 
 # ======= Routing =======
 
-@app.callback(Output("page-content", "children"), Input("url", "pathname"))
 def display_page(pathname):
+    pathname = pathname[len(PATH):] or "/"
     if pathname == "/":
         return dashboard_page()
     elif pathname == "/patients":
@@ -146,60 +148,79 @@ def display_page(pathname):
         return settings_page()
     return html.H1("404 - Page not found")
 
-# ======= Live Updating Cards =======
+# ======= Callbacks =======
 
-@app.callback(Output("active-patient-count", "children"), Input("refresh-labs", "n_intervals"))
-def update_active_patients(_):
-    try:
-        data = requests.get(f"{API}/active_patients").json()
-        return str(len(data))
-    except:
-        return "0"
+def register_callbacks(app):
+    # ======= Live Updating Cards =======
 
-@app.callback(Output("lab-report-count", "children"), Input("refresh-labs", "n_intervals"))
-def update_lab_reports(_):
-    try:
-        data = requests.get(f"{API}/recent_lab_reports").json()
-        return str(len(data))
-    except:
-        return "0"
+    # One backend request per tick; the cards and lists below read the stored snapshot
+    @app.callback(Output("nurse-snapshot", "data"), Input("nurse-refresh-labs", "n_intervals"))
+    def fetch_snapshot(_):
+        try:
+            return api_client.get("/dashboard_snapshot", params={"sections": SNAPSHOT_SECTIONS})
+        except:
+            return None
 
-@app.callback(Output("lab-reports-list", "children"), Input("refresh-labs", "n_intervals"))
-def refresh_lab_list(_):
-    try:
-        data = requests.get(f"{API}/recent_lab_reports").json()
-        items = [html.Li(f"{r['report_type']} - {r['result']} ({r['report_date']})") for r in data[:10]]
-        return html.Ul(items)
-    except:
-        return html.Div("No recent lab reports available.")
+    @app.callback(Output("nurse-active-patient-count", "children"), Input("nurse-snapshot", "data"))
+    def update_active_patients(snapshot):
+        return str(snapshot["active_patient_count"]) if snapshot else "0"
 
-# ======= Submitting New Lab Report =======
+    @app.callback(Output("nurse-lab-report-count", "children"), Input("nurse-snapshot", "data"))
+    def update_lab_reports(snapshot):
+        return str(len(snapshot["recent_lab_reports"])) if snapshot else "0"
 
-@app.callback(
-    Output("submit-status", "children"),
-    Input("submit-lab-btn", "n_clicks"),
-    State("patient-id", "value"),
-    State("report-type", "value"),
-    State("report-result", "value"),
-    prevent_initial_call=True
-)
-def submit_lab_report(n_clicks, patient_id, report_type, report_result):
-    try:
-        payload = {
-            "patient_id": patient_id,
-            "report_type": report_type,
-            "report_date": pd.Timestamp.now().isoformat(),
-            "result": report_result
-        }
-        # 🚨 NOTE: You need to create /save_lab_report in FastAPI backend for real saving
-        response = requests.post(f"{API}/save_lab_report", json=payload)
-        if response.status_code == 200:
-            return dbc.Alert("✅ Lab Report Saved Successfully!", color="success")
-        else:
-            return dbc.Alert("❌ Failed to save Lab Report.", color="danger")
-    except Exception as e:
-        return dbc.Alert(f"❌ Error: {str(e)}", color="danger")
-
-# ======= Run =======
-if __name__ == "__main__":
-    app.run(debug=True, port=8052)
+    @app.callback(Output("nurse-lab-reports-list", "children"), Input("nurse-snapshot", "data"))
+    def refresh_lab_list(snapshot):
+        if not snapshot:
+            return html.Div("No recent lab reports available.")
+        items = [html.Li(f"{r['report_type']} - {r['result']} ({r['report_date']})") for r in snapshot["recent_lab_reports"][:10]]
+        return html.Ul(items)
+
+    # ======= Patient Table (server-side paging, sorting, filtering) =======
+
+    @app.callback(
+        Output("nurse-patients-table", "data"),
+        Output("nurse-patients-table", "page_count"),
+        Input("nurse-patients-table", "page_current"),
+        Input("nurse-patients-table", "page_size"),
+        Input("nurse-patients-table", "sort_by"),
+        Input("nurse-patients-table", "filter_query")
+    )
+    def page_patients_table(page_current, page_size, sort_by, filter_query):
+        try:
+            result = api_client.get("/active_patients_page", params={
+                "page": page_current or 0,
+                "page_size": page_size,
+                "sort_by": json.dumps(sort_by or []),
+                "filter_query": filter_query or "",
+            })
+            return result["rows"], result["page_count"]
+        except:
+            return [], 1
+
+    # ======= Submitting New Lab Report =======
+
+    @app.callback(
+        Output("nurse-submit-status", "children"),
+        Input("nurse-submit-lab-btn", "n_clicks"),
+        State("nurse-patient-id", "value"),
+        State("nurse-report-type", "value"),
+        State("nurse-report-result", "value"),
+        prevent_initial_call=True
+    )
+    def submit_lab_report(n_clicks, patient_id, report_type, report_result):
+        try:
+            payload = {
+                "patient_id": patient_id,
+                "report_type": report_type,
+                "report_date": pd.Timestamp.now().isoformat(),
+                "result": report_result
+            }
+            # 🚨 NOTE: You need to create /save_lab_report in FastAPI backend for real saving
+            response = api_client.post("/save_lab_report", payload)
+            if response.status_code == 200:
+                return dbc.Alert("✅ Lab Report Saved Successfully!", color="success")
+            else:
+                return dbc.Alert("❌ Failed to save Lab Report.", color="danger")
+        except Exception as e:
+            return dbc.Alert(f"❌ Error: {str(e)}", color="danger")
@@ -1,69 +1,67 @@
 # patient_portal.py
 
-import dash
 from dash import html, dcc, Input, Output, State
 import dash_bootstrap_components as dbc
 import plotly.express as px
 import pandas as pd
-import requests
-
-# Initialize app
-app = dash.Dash(__name__, external_stylesheets=[dbc.themes.LUX], suppress_callback_exceptions=True)
-server = app.server
-API = "http://localhost:8000"
+import api_client
+import risk_charts
 
 # ======= Layout =======
-app.layout = dbc.Container([
-    html.H2("🏥 Patient Health Portal", className="text-center text-primary my-4 fw-bold"),
-
-    dbc.Tabs([
-        dbc.Tab(label="📋 Health Records", tab_id="records"),
-        dbc.Tab(label="💊 Medications", tab_id="meds"),
-        dbc.Tab(label="🧪 Lab Results", tab_id="labs"),
-        dbc.Tab(label="❤️ Risk Scores", tab_id="risks"),
-        dbc.Tab(label="💉 Vaccinations", tab_id="vaccines"),
-        dbc.Tab(label="📚 Education", tab_id="education"),
-        dbc.Tab(label="📨 Messages", tab_id="messages"),
-        dbc.Tab(label="📅 Appointments", tab_id="appointments"),
-        dbc.Tab(label="📓 Symptom Journal", tab_id="journal"),
-        dbc.Tab(label="🎯 Health Goals", tab_id="goals")
-    ], id="tabs", active_tab="records", className="mb-3"),
-
-    html.Div(id="tab-content")
-], fluid=True)
+def layout(pathname=None):
+    return dbc.Container([
+        html.H2("🏥 Patient Health Portal", className="text-center text-primary my-4 fw-bold"),
+
+        dbc.Tabs([
+            dbc.Tab(label="📋 Health Records", tab_id="records"),
+            dbc.Tab(label="💊 Medications", tab_id="meds"),
+            dbc.Tab(label="🧪 Lab Results", tab_id="labs"),
+            dbc.Tab(label="❤️ Risk Scores", tab_id="risks"),
+            dbc.Tab(label="💉 Vaccinations", tab_id="vaccines"),
+            dbc.Tab(label="📚 Education", tab_id="education"),
+            dbc.Tab(label="📨 Messages", tab_id="messages"),
+            dbc.Tab(label="📅 Appointments", tab_id="appointments"),
+            dbc.Tab(label="📓 Symptom Journal", tab_id="journal"),
+            dbc.Tab(label="🎯 Health Goals", tab_id="goals")
+        ], id="portal-tabs", active_tab="records", className="mb-3"),
+
+        html.Div(id="portal-tab-content")
+    ], fluid=True)
 
 # ======= Callbacks =======
 
-@app.callback(Output("tab-content", "children"), Input("tabs", "active_tab"))
-def render_tab(tab):
-    if tab == "records":
-        return get_health_records()
-    elif tab == "meds":
-        return get_medications()
-    elif tab == "labs":
-        return get_lab_results()
-    elif tab == "risks":
-        return get_risk_scores()
-    elif tab == "vaccines":
-        return get_vaccination_records()
-    elif tab == "education":
-        return get_educational_resources()
-    elif tab == "messages":
-        return get_messages_section()
-    elif tab == "appointments":
-        return get_appointments()
-    elif tab == "journal":
-        return get_symptom_journal()
-    elif tab == "goals":
-        return get_health_goals()
-    else:
-        return "Tab content not found."
+def register_callbacks(app):
+
+    @app.callback(Output("portal-tab-content", "children"), Input("portal-tabs", "active_tab"))
+    def render_tab(tab):
+        if tab == "records":
+            return get_health_records()
+        elif tab == "meds":
+            return get_medications()
+        elif tab == "labs":
+            return get_lab_results()
+        elif tab == "risks":
+            return get_risk_scores()
+        elif tab == "vaccines":
+            return get_vaccination_records()
+        elif tab == "education":
+            return get_educational_resources()
+        elif tab == "messages":
+            return get_messages_section()
+        elif tab == "appointments":
+            return get_appointments()
+        elif tab == "journal":
+            return get_symptom_journal()
+        elif tab == "goals":
+            return get_health_goals()
+        else:
+            return "Tab content not found."
 
 # ======= Sections =======
 
 def get_health_records():
     try:
-        patients = requests.get(f"{API}/active_patients").json()
+        patients = api_client.get("/active_patients")
         if not patients:
             return html.Div("No patient records available.")
         patient = patients[0]  # Assume logged-in patient's first record (can be customized)
@@ -90,7 +88,7 @@ def get_medications():
 
 def get_lab_results():
     try:
-        labs = requests.get(f"{API}/recent_lab_reports").json()
+        labs = api_client.get("/recent_lab_reports")
         if not labs:
             return html.Div("No lab reports available.")
         df = pd.DataFrame(labs)
@@ -103,14 +101,10 @@ def get_lab_results():
 
 def get_risk_scores():
     try:
-        risks = requests.get(f"{API}/risk_scores").json()
-        if not risks:
+        risks = api_client.get("/risk_series", params={"max_points": risk_charts.MAX_POINTS})
+        if not risks["total_points"]:
             return html.Div("No risk scores available.")
-        df = pd.DataFrame(risks)
-        fig = px.line(df, x="score_date", y=["heart_disease_risk", "diabetes_risk"],
-                      title="Risk Score Trends", markers=True)
-        fig.update_layout(legend_title_text="Risk Type")
-        return dcc.Graph(figure=fig)
+        return dcc.Graph(figure=risk_charts.risk_series_figure(risks, "Risk Score Trends"))
     except:
         return html.Div("Error loading risk scores.")
 
@@ -137,13 +131,13 @@ def get_educational_resources():
 def get_messages_section():
     return html.Div([
         html.H4("Secure Messaging"),
-        dbc.Textarea(id="message-box", placeholder="Type your message here...", className="mb-2"),
+        dbc.Textarea(id="portal-message-box", placeholder="Type your message here...", className="mb-2"),
         dbc.Button("Send Message", color="primary")
     ])
 
 def get_appointments():
     try:
-        appointments = requests.get(f"{API}/appointments_today").json()
+        appointments = api_client.get("/appointments_today")
         if not appointments:
             return html.Div("No upcoming appointments.")
         items = [html.Li(f"{appt['appointment_date']} - {appt['doctor_name']}") for appt in appointments]
@@ -169,7 +163,3 @@ def get_health_goals():
             html.Li("Control blood sugar to normal range")
         ])
     ])
-
-# ======= Run =======
-if __name__ == '__main__':
-    app.run(debug=True, port=8056)
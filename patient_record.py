@@ -1,132 +1,129 @@
+# patient_record.py
+
 import dash
 from dash import html, dcc, Input, Output, State
 import dash_bootstrap_components as dbc
-import pandas as pd
-import requests
-
-app = dash.Dash(__name__, external_stylesheets=[dbc.themes.BOOTSTRAP])
-server = app.server
-API = "http://localhost:8000"
-
-app.layout = dbc.Container([
-    html.H2("📋 Top Risky Patients", className="my-4 text-primary"),
-
-    # Filters
-    dbc.Row([
-        dbc.Col([
-            html.Label("🧬 Risk Type"),
-            dcc.Dropdown(
-                id="risk-type",
-                options=[
-                    {"label": "Heart Risk", "value": "heart"},
-                    {"label": "Diabetes Risk", "value": "diabetes"},
-                    {"label": "Both", "value": "both"}
-                ],
-                value="both",
-                clearable=False
-            )
-        ], md=3),
-
-        dbc.Col([
-            html.Label("⚠️ Minimum Risk Threshold"),
-            dcc.Slider(
-                id="min-risk",
-                min=0,
-                max=1,
-                step=0.05,
-                value=0.4,
-                tooltip={"placement": "bottom", "always_visible": True}
-            )
-        ], md=5),
-
-        dbc.Col([
-            html.Label("🧑 Gender (optional)"),
-            dcc.Dropdown(id="gender-filter", placeholder="All", clearable=True)
-        ], md=4)
-    ], className="mb-4"),
-
-    html.Div(id="patient-table"),
-
-    dcc.Interval(id='interval-update', interval=15 * 1000, n_intervals=0)
-], fluid=True)
-
-
-@app.callback(
-    Output("gender-filter", "options"),
-    Input("interval-update", "n_intervals")
-)
-def populate_gender_filter(_):
-    try:
-        data = requests.get(f"{API}/risk_scores").json()
-        df = pd.DataFrame(data)
-        genders = df["gender"].dropna().unique()
-        return [{"label": gender.title(), "value": gender} for gender in genders]
-    except:
-        return []
-
-
-@app.callback(
-    Output("patient-table", "children"),
-    Input("interval-update", "n_intervals"),
-    Input("risk-type", "value"),
-    Input("min-risk", "value"),
-    Input("gender-filter", "value")
-)
-def load_patient_table(_, risk_type, min_risk, gender_filter):
-    try:
-        data = requests.get(f"{API}/risk_scores").json()
-        df = pd.DataFrame(data)
-
-        # Filter by gender if selected
-        if gender_filter:
-            df = df[df["gender"] == gender_filter]
-
-        # Risk filtering
-        if risk_type == "heart":
-            df = df[df["heart_disease_risk"] >= min_risk]
-        elif risk_type == "diabetes":
-            df = df[df["diabetes_risk"] >= min_risk]
-        else:  # both
-            df = df[(df["heart_disease_risk"] >= min_risk) | (df["diabetes_risk"] >= min_risk)]
-
-        # Combine for ranking
-        df["combined_risk"] = df["heart_disease_risk"] + df["diabetes_risk"]
-        df = df.sort_values(by="combined_risk", ascending=False).head(100)
-
-        # Format risk visually
-        def format_risk(val):
-            if val > 0.7:
-                return html.Span(f"{val:.2f}", style={"color": "red", "fontWeight": "bold"})
-            elif val > 0.4:
-                return html.Span(f"{val:.2f}", style={"color": "orange", "fontWeight": "bold"})
-            return html.Span(f"{val:.2f}")
-
-        table_header = [
-            html.Thead(html.Tr([
-                html.Th("Patient Name"),
-                html.Th("Heart Risk"),
-                html.Th("Diabetes Risk"),
-                html.Th("Gender"),
-                html.Th("Last Updated")
-            ]))
-        ]
-
-        table_rows = []
-        for _, row in df.iterrows():
-            table_rows.append(html.Tr([
-                html.Td(f"{row['first_name']} {row['last_name']}"),
-                html.Td(format_risk(row['heart_disease_risk'])),
-                html.Td(format_risk(row['diabetes_risk'])),
-                html.Td(row.get("gender", "N/A")),
-                html.Td(row['score_date'])
-            ]))
-
-        return dbc.Table(table_header + [html.Tbody(table_rows)],
-                         bordered=True, hover=True, responsive=True, striped=True)
-
-    except Exception as e:
-        return html.Div(f"Error loading records: {str(e)}", className="text-danger")
-
-
-if __name__ == "__main__":
-    app.run(debug=True, port=8052)
+import api_client
+import tables
+
+# Rows shown: the highest combined-risk patients passing the filters
+TOP_K = 100
+
+def layout(pathname=None):
+    return dbc.Container([
+        html.H2("📋 Top Risky Patients", className="my-4 text-primary"),
+
+        # Filters
+        dbc.Row([
+            dbc.Col([
+                html.Label("🧬 Risk Type"),
+                dcc.Dropdown(
+                    id="record-risk-type",
+                    options=[
+                        {"label": "Heart Risk", "value": "heart"},
+                        {"label": "Diabetes Risk", "value": "diabetes"},
+                        {"label": "Both", "value": "both"}
+                    ],
+                    value="both",
+                    clearable=False
+                )
+            ], md=3),
+
+            dbc.Col([
+                html.Label("⚠️ Minimum Risk Threshold"),
+                dcc.Slider(
+                    id="record-min-risk",
+                    min=0,
+                    max=1,
+                    step=0.05,
+                    value=0.4,
+                    tooltip={"placement": "bottom", "always_visible": True}
+                )
+            ], md=5),
+
+            dbc.Col([
+                html.Label("🧑 Gender (optional)"),
+                dcc.Dropdown(id="record-gender-filter", placeholder="All", clearable=True)
+            ], md=4)
+        ], className="mb-4"),
+
+        tables.paged_table("record-patient-table", [
+            ("patient_name", "Patient Name"),
+            ("heart_disease_risk", "Heart Risk"),
+            ("diabetes_risk", "Diabetes Risk"),
+            ("gender", "Gender"),
+            ("score_date", "Last Updated"),
+        ], risk_columns=("heart_disease_risk", "diabetes_risk"), action="native"),
+        html.Div(id="record-table-status", className="text-danger"),
+        dcc.Store(id="record-snapshot"),
+
+        dcc.Interval(id='record-interval-update', interval=15 * 1000, n_intervals=0)
+    ], fluid=True)
+
+
+def register_callbacks(app):
+
+    @app.callback(
+        Output("record-gender-filter", "options"),
+        Input("record-interval-update", "n_intervals")
+    )
+    def populate_gender_filter(_):
+        try:
+            genders = api_client.get("/genders", ttl=60)
+            return [{"label": gender.title(), "value": gender} for gender in genders]
+        except:
+            return []
+
+
+    # Once per refresh: the latest score of every patient as compact columns.
+    # Unchanged snapshots aren't resent to the browser.
+    @app.callback(
+        Output("record-snapshot", "data"),
+        Output("record-table-status", "children"),
+        Input("record-interval-update", "n_intervals"),
+        State("record-snapshot", "data")
+    )
+    def load_snapshot(_, current):
+        # The backend answers {"unchanged": true} without the columns while our version is current
+        params = {"since": current["version"]} if current else None
+        try:
+            snapshot = api_client.get("/latest_risk_snapshot", params=params)
+        except Exception as e:
+            return dash.no_update, f"Error loading records: {str(e)}"
+        if snapshot.get("unchanged"):
+            return dash.no_update, ""
+        return snapshot, ""
+
+    # Threshold, gender and ranking are applied in the browser: moving the slider
+    # or changing a dropdown costs no server CPU and no request.
+    app.clientside_callback(
+        """
+        function(snapshot, riskType, minRisk, gender) {
+            if (!snapshot) { return []; }
+            const c = snapshot.columns;
+            const rows = [];
+            // The snapshot is ordered by combined risk, so the first LIMIT matches are the top LIMIT
+            for (let i = 0; i < c.patient_id.length && rows.length < LIMIT; i++) {
+                const heart = c.heart_disease_risk[i], diabetes = c.diabetes_risk[i];
+                if (gender && c.gender[i] !== gender) { continue; }
+                const keep = riskType === "heart" ? heart >= minRisk
+                    : riskType === "diabetes" ? diabetes >= minRisk
+                    : heart >= minRisk || diabetes >= minRisk;
+                if (!keep) { continue; }
+                rows.push({
+                    patient_name: c.first_name[i] + " " + c.last_name[i],
+                    heart_disease_risk: heart,
+                    diabetes_risk: diabetes,
+                    gender: c.gender[i],
+                    score_date: c.score_date[i]
+                });
+            }
+            return rows;
+        }
+        """.replace("LIMIT", str(TOP_K)),
+        Output("record-patient-table", "data"),
+        Input("record-snapshot", "data"),
+        Input("record-risk-type", "value"),
+        Input("record-min-risk", "value"),
+        Input("record-gender-filter", "value")
+    )
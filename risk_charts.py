@@ -0,0 +1,19 @@
+# risk_charts.py
+
+import plotly.graph_objects as go
+
+MAX_POINTS = 2000        # per series, asked of /risk_series (downsampled server-side beyond this)
+WEBGL_THRESHOLD = 1000   # traces with more points are drawn with WebGL instead of SVG
+MARKER_LIMIT = 200       # markers only while they can still be told apart
+
+def risk_series_figure(data, title):
+    """Line chart of a /risk_series response; render cost is bounded by MAX_POINTS."""
+    series = data["series"]
+    points = max((len(s["x"]) for s in series.values()), default=0)
+    trace = go.Scattergl if points > WEBGL_THRESHOLD else go.Scatter
+    mode = "lines+markers" if points <= MARKER_LIMIT else "lines"
+    fig = go.Figure([trace(x=s["x"], y=s["y"], mode=mode, name=name) for name, s in series.items()])
+    if data["total_points"] > points:
+        title = f"{title} ({points:,} of {data['total_points']:,} points, {data['method']})"
+    fig.update_layout(title=title, legend_title_text="Risk Type", xaxis_title="Date", yaxis_title="Risk Score")
+    return fig
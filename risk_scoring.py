@@ -0,0 +1,120 @@
+# risk_scoring.py
+
+import numpy as np
+
+# Feature order used by the scoring formulas and the trained models
+FEATURES = ['age', 'systolic', 'diastolic', 'heart_rate', 'glucose_level', 'bmi', 'hemoglobin', 'cholesterol']
+
+# Risk band thresholds shared by every dashboard
+HIGH_RISK = 0.7
+MODERATE_RISK = 0.4
+
+BAND_LABELS = np.array(["Low Risk", "Moderate Risk", "High Risk"])
+BAND_COLORS = np.array(["success", "warning", "danger"])
+
+# ---------- Formulas ----------
+def _round2(values):
+    """Round to 2 decimals exactly like Python's round(x, 2), which the scores were
+    first computed with. np.round(x, 2) rounds x * 100, whose own rounding error can
+    flip a value lying within a hair of a half-cent; those few go through round()."""
+    values = np.asarray(values, dtype=float)
+    flat = values.ravel()
+    scaled = flat * 100
+    rounded = np.round(scaled) / 100
+    near_tie = np.abs(scaled - np.floor(scaled) - 0.5) < 1e-6
+    if near_tie.any():
+        rounded[near_tie] = [round(value, 2) for value in flat[near_tie].tolist()]
+    return rounded.reshape(values.shape)[()]
+
+def heart_risk(age, systolic, diastolic, heart_rate, bmi, cholesterol):
+    score = (
+        0.02 * np.asarray(age, dtype=float) +
+        0.015 * np.asarray(systolic, dtype=float) +
+        0.01 * np.asarray(diastolic, dtype=float) +
+        0.02 * np.asarray(heart_rate, dtype=float) +
+        0.03 * np.asarray(bmi, dtype=float) +
+        0.025 * np.asarray(cholesterol, dtype=float) / 10
+    )
+    return _round2(np.minimum(score / 10, 1))
+
+def diabetes_risk(age, glucose, bmi, hemoglobin):
+    score = (
+        0.03 * np.asarray(age, dtype=float) +
+        0.05 * np.asarray(glucose, dtype=float) +
+        0.04 * np.asarray(bmi, dtype=float) +
+        -0.02 * np.asarray(hemoglobin, dtype=float)
+    )
+    return _round2(np.minimum(score / 15, 1))
+
+# ---------- Bands ----------
+def band_index(scores):
+    """0 = low, 1 = moderate, 2 = high (thresholds are exclusive, as in the dashboards)."""
+    scores = np.asarray(scores, dtype=float)
+    return (scores > MODERATE_RISK).astype(np.int8) + (scores > HIGH_RISK)
+
+def risk_band(scores):
+    labels = BAND_LABELS[band_index(scores)]
+    return labels if labels.ndim else str(labels)
+
+def risk_color(scores):
+    colors = BAND_COLORS[band_index(scores)]
+    return colors if colors.ndim else str(colors)
+
+# ---------- Vectorized scoring ----------
+def _parse_float(text):
+    try:
+        return float(text)
+    except ValueError:
+        return np.nan
+
+_parse_floats = np.vectorize(_parse_float, otypes=[float])
+
+def _to_float(strings):
+    # Whole-array conversion is fast; only a malformed value falls back to one at a time
+    try:
+        return strings.astype(float)
+    except ValueError:
+        return _parse_floats(strings)
+
+def split_blood_pressure(blood_pressure):
+    """Split "120/80" strings into float systolic and diastolic arrays (NaN when malformed)."""
+    bp = np.asarray(blood_pressure, dtype=str)
+    systolic = np.full(bp.shape, np.nan)
+    diastolic = np.full(bp.shape, np.nan)
+    if bp.size == 0:  # np.char.partition can't size its output for an empty array
+        return systolic, diastolic
+    parts = np.char.partition(bp, "/")
+    valid = parts[..., 1] == "/"
+    systolic[valid] = _to_float(parts[..., 0][valid])
+    diastolic[valid] = _to_float(parts[..., 2][valid])
+    return systolic, diastolic
+
+def _column(vitals, name):
+    return np.asarray(vitals[name], dtype=float)
+
+def score_vitals(vitals):
+    """Score a DataFrame or mapping of column -> array in one pass.
+
+    Needs `age`, `heart_rate`, `glucose_level`, `bmi`, `hemoglobin`, `cholesterol`
+    and either `systolic`/`diastolic` or a `blood_pressure` column. Returns a dict
+    of arrays: both scores and their risk bands.
+    """
+    if "systolic" in vitals and "diastolic" in vitals:
+        systolic, diastolic = _column(vitals, "systolic"), _column(vitals, "diastolic")
+    else:
+        systolic, diastolic = split_blood_pressure(vitals["blood_pressure"])
+
+    age = _column(vitals, "age")
+    bmi = _column(vitals, "bmi")
+    heart = heart_risk(age, systolic, diastolic, _column(vitals, "heart_rate"), bmi, _column(vitals, "cholesterol"))
+    diabetes = diabetes_risk(age, _column(vitals, "glucose_level"), bmi, _column(vitals, "hemoglobin"))
+    return {
+        "heart_disease_risk": heart,
+        "diabetes_risk": diabetes,
+        "heart_band": risk_band(heart),
+        "diabetes_band": risk_band(diabetes),
+    }
+
+def score_frame(df):
+    """Return a copy of df with risk score and band columns added."""
+    return df.assign(**score_vitals(df))
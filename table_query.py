@@ -0,0 +1,82 @@
+# table_query.py
+
+# Server-side paging, sorting and filtering for dash_table.DataTable with
+# page_action / sort_action / filter_action = "custom". The table sends its
+# filter as a query string such as "{gender} s= Female && {age} > 40", which is
+# turned into a WHERE clause over whitelisted columns.
+
+import json
+
+# DataTable operator (with and without the "s"/"i" case prefixes) -> SQL operator
+OPERATORS = {
+    "=": "=", "eq": "=", "!=": "!=", "ne": "!=",
+    "<": "<", "lt": "<", "<=": "<=", "le": "<=",
+    ">": ">", "gt": ">", ">=": ">=", "ge": ">=",
+    "contains": "contains", "datestartswith": "datestartswith",
+}
+
+def parse_filter(filter_query):
+    """[(column, operator, value)] from a DataTable filter_query; unknown parts are skipped."""
+    filters = []
+    for part in (filter_query or "").split(" && "):
+        part = part.strip()
+        if not part.startswith("{") or "}" not in part:
+            continue
+        column, rest = part[1:].split("}", 1)
+        pieces = rest.strip().split(" ", 1)
+        operator = pieces[0].lower().lstrip("si") if pieces[0].lower() not in OPERATORS else pieces[0].lower()
+        if operator not in OPERATORS or len(pieces) < 2:
+            continue
+        value = pieces[1].strip()
+        if len(value) >= 2 and value[0] == value[-1] and value[0] in "\"'`":
+            value = value[1:-1]
+        elif OPERATORS[operator] not in ("contains", "datestartswith"):
+            try:
+                value = float(value)
+            except ValueError:
+                pass
+        filters.append((column, OPERATORS[operator], value))
+    return filters
+
+# ---------- SQL ----------
+def sql_where(filter_query, columns):
+    """(" AND ..." clause, params) for the filters on whitelisted columns (name -> SQL expression)."""
+    clauses, params = [], []
+    for column, operator, value in parse_filter(filter_query):
+        if column not in columns:
+            continue
+        expression = columns[column]
+        if operator == "contains":
+            clauses.append(f"{expression} LIKE ?")
+            params.append(f"%{value}%")
+        elif operator == "datestartswith":
+            clauses.append(f"{expression} LIKE ?")
+            params.append(f"{value}%")
+        else:
+            clauses.append(f"{expression} {operator} ?")
+            params.append(value)
+    return "".join(f" AND {clause}" for clause in clauses), params
+
+def parse_sort_by(sort_by):
+    """The DataTable sort_by list from its JSON, or None if it isn't a list of
+    {"column_id": str, "direction": "asc" | "desc"}."""
+    try:
+        sort_by = json.loads(sort_by or "[]")
+    except ValueError:
+        return None
+    if not isinstance(sort_by, list) or not all(
+            isinstance(s, dict) and isinstance(s.get("column_id"), str) and s.get("direction") in ("asc", "desc")
+            for s in sort_by):
+        return None
+    return sort_by
+
+def sql_order(sort_by, columns, default):
+    """ORDER BY expression for a DataTable sort_by list, falling back to default."""
+    terms = [
+        f"{columns[s['column_id']]} {'DESC' if s['direction'] == 'desc' else 'ASC'}"
+        for s in sort_by or [] if s["column_id"] in columns
+    ]
+    return ", ".join(terms) or default
+
+def page_count(total, page_size):
+    return max(1, -(-total // page_size))
@@ -0,0 +1,44 @@
+# tables.py
+
+from dash import dash_table
+
+from risk_scoring import HIGH_RISK, MODERATE_RISK
+
+PAGE_SIZE = 25
+
+def risk_band_styles(columns):
+    """style_data_conditional colouring risk cells like the dashboards' bands (later rules win)."""
+    styles = []
+    for column in columns:
+        styles += [
+            {"if": {"filter_query": f"{{{column}}} > {MODERATE_RISK}", "column_id": column},
+             "color": "orange", "fontWeight": "bold"},
+            {"if": {"filter_query": f"{{{column}}} > {HIGH_RISK}", "column_id": column},
+             "color": "red", "fontWeight": "bold"},
+        ]
+    return styles
+
+def paged_table(table_id, columns, page_size=PAGE_SIZE, risk_columns=(), action="custom", **kwargs):
+    """DataTable whose paging, sorting and filtering are done by a server callback
+    (see table_query), so the browser only ever holds and renders one page.
+    action="native" does them in the browser instead, for small data already sent there."""
+    return dash_table.DataTable(
+        id=table_id,
+        columns=[{"name": name, "id": column_id, **({"type": "numeric", "format": {"specifier": ".2f"}}
+                                                     if column_id in risk_columns else {})}
+                 for column_id, name in columns],
+        data=[],
+        page_current=0,
+        page_size=page_size,
+        page_action=action,
+        sort_action=action,
+        sort_mode="multi",
+        sort_by=[],
+        filter_action=action,
+        filter_query="",
+        style_data_conditional=risk_band_styles(risk_columns),
+        style_table={"overflowX": "auto"},
+        style_cell={"textAlign": "left", "padding": "6px"},
+        style_header={"fontWeight": "bold"},
+        **kwargs,
+    )
@@ -1,17 +1,56 @@
+import argparse
+import hashlib
+import json
+import os
+import shutil
 import sqlite3
+import tempfile
+import time
+from datetime import date, datetime
+from concurrent.futures import ProcessPoolExecutor, as_completed
 import pandas as pd
 import numpy as np
 import joblib
 from sklearn.model_selection import train_test_split
 from sklearn.metrics import r2_score, mean_squared_error
 from sklearn.ensemble import RandomForestRegressor, GradientBoostingRegressor
-from sklearn.linear_model import LinearRegression
+from sklearn.linear_model import LinearRegression, Ridge, ElasticNet
+from sklearn.multioutput import MultiOutputRegressor
 from xgboost import XGBRegressor
 
-# Step 1: Load data
-conn = sqlite3.connect("healthcare.db")
-query = """
-SELECT 
+import model_registry
+import tree_compiler
+from database_setup import create_schema
+from risk_scoring import FEATURES, split_blood_pressure
+
+TARGETS = {"Heart Disease": "heart_disease_risk", "Diabetes": "diabetes_risk"}
+ARTIFACTS = {"Heart Disease": "heart_risk_model.pkl", "Diabetes": "diabetes_risk_model.pkl"}
+REGISTRY_NAMES = {"Heart Disease": "heart", "Diabetes": "diabetes"}
+
+# One model predicting both targets (columns in TARGETS order)
+MULTI_TASK = "Heart Disease + Diabetes"
+MULTI_ARTIFACT = "risk_model.pkl"
+MULTI_REGISTRY_NAME = "risk"
+
+# Each vitals row is paired with the risk score from the same visit: same patient,
+# same date, and the same position among that day's rows (in case of repeat visits).
+TRAINING_QUERY = """
+WITH v AS (
+    SELECT vital_id, patient_id, record_date, blood_pressure, heart_rate,
+           glucose_level, bmi, hemoglobin, cholesterol,
+           ROW_NUMBER() OVER (PARTITION BY patient_id, record_date ORDER BY vital_id) AS visit_seq
+    FROM Vitals
+    {patient_filter}
+),
+rs AS (
+    SELECT risk_id, patient_id, score_date, heart_disease_risk, diabetes_risk,
+           ROW_NUMBER() OVER (PARTITION BY patient_id, score_date ORDER BY risk_id) AS visit_seq
+    FROM RiskScores
+    {patient_filter}
+)
+SELECT
+    v.vital_id,
+    rs.risk_id,
     CAST((julianday('now') - julianday(p.date_of_birth)) / 365.25 AS INT) AS age,
     v.blood_pressure,
     v.heart_rate,
@@ -21,85 +60,605 @@ SELECT
     v.cholesterol,
     rs.heart_disease_risk,
     rs.diabetes_risk
-FROM Vitals v
+FROM v
 JOIN Patients p ON v.patient_id = p.patient_id
-JOIN RiskScores rs ON rs.patient_id = p.patient_id
+JOIN rs ON rs.patient_id = v.patient_id
+       AND rs.score_date = v.record_date
+       AND rs.visit_seq = v.visit_seq
+{row_filter}
 """
-df = pd.read_sql(query, conn)
-conn.close()
 
-# Preprocessing
-df = df[df['blood_pressure'].str.contains('/')]
-df[['systolic', 'diastolic']] = df['blood_pressure'].str.split('/', expand=True).astype(float)
-df.drop(columns=['blood_pressure'], inplace=True)
-df.dropna(inplace=True)
+# Only patients with rows past the high-water mark need their visits re-paired
+SINCE_PATIENT_FILTER = """WHERE patient_id IN (
+        SELECT patient_id FROM Vitals WHERE vital_id > :vital_id
+        UNION
+        SELECT patient_id FROM RiskScores WHERE risk_id > :risk_id
+    )"""
+SINCE_ROW_FILTER = "WHERE v.vital_id > :vital_id OR rs.risk_id > :risk_id"
 
-print(f"✅ Loaded {df.shape[0]} records for training.")
+def training_query(since=None):
+    if since is None:
+        return TRAINING_QUERY.format(patient_filter="", row_filter=""), None
+    return TRAINING_QUERY.format(patient_filter=SINCE_PATIENT_FILTER, row_filter=SINCE_ROW_FILTER), since
 
-X = df[['age', 'systolic', 'diastolic', 'heart_rate', 'glucose_level', 'bmi', 'hemoglobin', 'cholesterol']]
-y_heart = df['heart_disease_risk']
-y_diabetes = df['diabetes_risk']
+# Vitals are float32, not int16: SQLite and /save_vitals accept fractional values (e.g. "120.5/80"),
+# which risk_scoring scores as they are, so truncating them would split features from labels
+COLUMN_TYPES = {
+    "vital_id": "int64",
+    "risk_id": "int64",
+    "age": "int16",  # whole years (CAST ... AS INT in the query)
+    "systolic": "float32",
+    "diastolic": "float32",
+    "heart_rate": "float32",
+    "glucose_level": "float32",
+    "cholesterol": "float32",
+    "bmi": "float32",
+    "hemoglobin": "float32",
+    "heart_disease_risk": "float32",
+    "diabetes_risk": "float32",
+}
 
-X_train, X_test, y_train_heart, y_test_heart, y_train_diabetes, y_test_diabetes = train_test_split(
-    X, y_heart, y_diabetes, test_size=0.2, random_state=42
-)
+# Step 1: Load data
+def prepare_chunk(chunk):
+    if chunk.empty:  # no new visits: every typed column, no rows
+        return pd.DataFrame({column: pd.Series(dtype=dtype) for column, dtype in COLUMN_TYPES.items()})
+    # Malformed (or missing) blood pressures come back as NaN and are dropped with the other incomplete rows
+    systolic, diastolic = split_blood_pressure(chunk['blood_pressure'].fillna(""))
+    chunk = chunk.drop(columns=['blood_pressure']).assign(systolic=systolic, diastolic=diastolic)
+    chunk = chunk.dropna()
+    return chunk.astype(COLUMN_TYPES)[list(COLUMN_TYPES)]
 
-# Model dictionary
-models = {
-    "RandomForest": RandomForestRegressor(n_estimators=100, random_state=42),
-    "GradientBoosting": GradientBoostingRegressor(n_estimators=100, random_state=42),
-    "XGBoost": XGBRegressor(n_estimators=100, random_state=42, verbosity=0),
-    "LinearRegression": LinearRegression()
+FEATURE_CACHE_DIR = os.environ.get("FEATURE_CACHE", "feature_cache")
+FEATURE_CACHE_KEEP = 3
+
+# Source columns the training matrix is built from, by table (ID column first)
+SOURCE_COLUMNS = {
+    "Patients": ["patient_id", "date_of_birth"],
+    "Vitals": ["vital_id", "patient_id", "record_date", "blood_pressure", "heart_rate",
+               "glucose_level", "bmi", "hemoglobin", "cholesterol"],
+    "RiskScores": ["risk_id", "patient_id", "score_date", "heart_disease_risk", "diabetes_risk"],
 }
+FINGERPRINT_ROWS = 100
+
+# Cached matrices are keyed on everything that can change the query result
+def snapshot_key(conn, db_path):
+    """Row counts and max IDs of the source tables, a hash of their newest
+    FINGERPRINT_ROWS rows, their in-place edit counters (TrainingDataEdits, kept
+    by triggers), the database path and today's date (age is computed from it).
+    The hash tells apart a database regenerated at the same path with the same
+    row counts. Writes that can't change the matrix keep the key."""
+    snapshot = {"date": date.today().isoformat(), "db": os.path.abspath(db_path),
+                "edits": dict(conn.execute("SELECT source, edits FROM TrainingDataEdits").fetchall())}
+    fingerprint = hashlib.sha256()
+    for table, columns in SOURCE_COLUMNS.items():
+        id_column = columns[0]
+        count, max_id = conn.execute(f"SELECT COUNT(*), MAX({id_column}) FROM {table}").fetchone()
+        snapshot[table] = [count, max_id]
+        newest = conn.execute(f"SELECT {', '.join(columns)} FROM {table} ORDER BY {id_column} DESC LIMIT ?",
+                              (FINGERPRINT_ROWS,)).fetchall()
+        fingerprint.update(repr(newest).encode())
+    snapshot["fingerprint"] = fingerprint.hexdigest()[:16]
+    recipe = TRAINING_QUERY + json.dumps(COLUMN_TYPES, sort_keys=True) + json.dumps(snapshot, sort_keys=True)
+    return hashlib.sha256(recipe.encode()).hexdigest()[:16], snapshot
+
+def read_feature_cache(key, cache_dir=FEATURE_CACHE_DIR):
+    """Columns memory-mapped from <cache_dir>/<key>/<column>.npy, or None on a miss."""
+    path = os.path.join(cache_dir, key)
+    if not os.path.isdir(path):
+        return None
+    columns = {column: np.load(os.path.join(path, f"{column}.npy"), mmap_mode="r") for column in COLUMN_TYPES}
+    return pd.DataFrame(columns, copy=False)
+
+def write_feature_cache(key, snapshot, df, cache_dir=FEATURE_CACHE_DIR):
+    os.makedirs(cache_dir, exist_ok=True)
+    staging = os.path.join(cache_dir, f".{key}.tmp")
+    shutil.rmtree(staging, ignore_errors=True)
+    os.makedirs(staging)
+    for column in COLUMN_TYPES:
+        np.save(os.path.join(staging, f"{column}.npy"), df[column].to_numpy())
+    with open(os.path.join(staging, "snapshot.json"), "w") as f:
+        json.dump(snapshot, f, indent=2)
+    os.replace(staging, os.path.join(cache_dir, key))
+
+    # Only the most recent snapshots are worth keeping
+    entries = sorted((e for e in os.scandir(cache_dir) if e.is_dir() and not e.name.startswith(".")),
+                     key=lambda e: e.stat().st_mtime, reverse=True)
+    for entry in entries[FEATURE_CACHE_KEEP:]:
+        shutil.rmtree(entry.path, ignore_errors=True)
+
+def load_training_data(db_path="healthcare.db", chunksize=100_000, since=None, cache_dir=FEATURE_CACHE_DIR):
+    """Stream the visit-aligned training rows in chunks with compact dtypes.
+
+    since={"vital_id": ..., "risk_id": ...} keeps only visits added after that
+    high-water mark. Full loads are cached under cache_dir and reused while the
+    source tables' row counts, max IDs, newest rows and edit counters are unchanged
+    (cache_dir=None disables this).
+    """
+    started = time.perf_counter()
+    conn = sqlite3.connect(db_path)
+    create_schema(conn)  # makes sure the visit indexes exist
+    key = snapshot = None
+    if since is None and cache_dir:
+        key, snapshot = snapshot_key(conn, db_path)
+        df = read_feature_cache(key, cache_dir)
+        if df is not None:
+            conn.close()
+            print(f"✅ Loaded {df.shape[0]} records for training from feature cache {key} "
+                  f"in {(time.perf_counter() - started) * 1000:.0f} ms.")
+            return df
+
+    chunks = []
+    n_raw = 0
+    query, params = training_query(since)
+    for chunk in pd.read_sql(query, conn, params=params, chunksize=chunksize):
+        n_raw += len(chunk)
+        chunks.append(prepare_chunk(chunk))
+    n_vitals = conn.execute("SELECT COUNT(*) FROM Vitals").fetchone()[0]
+    conn.close()
+
+    if chunks:
+        df = pd.concat(chunks, ignore_index=True)
+    else:
+        df = pd.DataFrame({column: pd.Series(dtype=dtype) for column, dtype in COLUMN_TYPES.items()})
+    print(f"✅ Loaded {df.shape[0]} records for training "
+          f"({n_vitals} vitals rows, {n_raw} matched to a same-visit risk score, "
+          f"{len(chunks)} chunks, {df.memory_usage(deep=True).sum() / 1e6:.1f} MB) "
+          f"in {time.perf_counter() - started:.1f}s.")
+    if key is not None:
+        write_feature_cache(key, snapshot, df, cache_dir)
+    return df
 
-# Collect results here
-results = []
+# Model dictionary
+def build_models(n_jobs=1, overrides=None, multi_output=False):
+    """Candidate models; overrides maps a family to {"params": {...}} from hyperparameter_search.py.
+    Ridge and ElasticNet are only candidates once the search has tuned them.
+
+    multi_output=True returns models fitted on both targets at once. Forests and
+    LinearRegression handle that natively and XGBoost grows trees with one leaf
+    value per target; GradientBoosting has no multi-output mode, so it is wrapped
+    and still runs one ensemble per target.
+    """
+    params = {family: entry["params"] for family, entry in (overrides or {}).items()}
+    gradient_boosting = GradientBoostingRegressor(**{"n_estimators": 100, **params.get("GradientBoosting", {})},
+                                                  random_state=42)
+    xgb_extra = {"multi_strategy": "multi_output_tree"} if multi_output else {}
+    models = {
+        "RandomForest": RandomForestRegressor(**{"n_estimators": 100, **params.get("RandomForest", {})},
+                                              random_state=42, n_jobs=n_jobs),
+        "GradientBoosting": MultiOutputRegressor(gradient_boosting) if multi_output else gradient_boosting,
+        "XGBoost": XGBRegressor(**{"n_estimators": 100, **params.get("XGBoost", {})},
+                                random_state=42, verbosity=0, n_jobs=n_jobs, **xgb_extra),
+        "LinearRegression": LinearRegression()
+    }
+    if "Ridge" in params:
+        models["Ridge"] = Ridge(**params["Ridge"])
+    if "ElasticNet" in params:
+        models["ElasticNet"] = ElasticNet(**{"max_iter": 5000, **params["ElasticNet"]})
+    return models
 
 def evaluate_model(model, X_train, X_test, y_train, y_test, task_name):
+    """Fit and score one model. Returns one row per target, so a multi-output
+    model is reported per task exactly like the separate models."""
+    started = time.perf_counter()
     model.fit(X_train, y_train)
+    fit_s = time.perf_counter() - started
+
+    started = time.perf_counter()
     preds = model.predict(X_test)
-    r2 = r2_score(y_test, preds)
-    rmse = np.sqrt(mean_squared_error(y_test, preds))
+    predict_s = time.perf_counter() - started
+
+    if task_name == MULTI_TASK:
+        tasks = list(TARGETS)
+    else:
+        tasks = [task_name]
+    y_test = np.asarray(y_test).reshape(len(preds), -1)
+    preds = np.asarray(preds).reshape(len(preds), -1)
+    rows = []
+    for i, task in enumerate(tasks):
+        rows.append({
+            "Task": task,
+            "Model": type(model).__name__,
+            "R² Score": round(r2_score(y_test[:, i], preds[:, i]), 4),
+            "RMSE": round(np.sqrt(mean_squared_error(y_test[:, i], preds[:, i])), 4),
+            "Fit (s)": round(fit_s, 2),
+            "Predict (s)": round(predict_s, 3)
+        })
+    return rows
+
+def _fit_candidate(args):
+    task_name, name, model, X_train, X_test, y_train, y_test, artifact_path = args
+    rows = evaluate_model(model, X_train, X_test, y_train, y_test, task_name)
+    # Fitted forests can be large: hand back a file instead of pickling through the pool
+    joblib.dump(model, artifact_path)
+    return [dict(row, Name=name, Artifact=artifact_path) for row in rows]
+
+def evaluate_models(X_train, X_test, targets_train, targets_test, work_dir, workers=None, tuned=None):
+    """Fit every (task, model) pair exactly once on a process pool.
+
+    Returns one results row per pair, including where the fitted model was saved.
+    tuned holds per-task parameter overrides saved by hyperparameter_search.py.
+    """
+    tuned = tuned or {}
+    workers = workers or os.cpu_count() or 1
+    n_pairs = sum(len(build_models(overrides=tuned.get(task_name), multi_output=task_name == MULTI_TASK))
+                  for task_name in targets_train)
+    # Spread any cores the pool leaves idle over the ensembles' own threads
+    n_jobs = max(1, (os.cpu_count() or 1) // min(workers, n_pairs))
+
+    jobs = [
+        (task_name, name, model, X_train, X_test, targets_train[task_name], targets_test[task_name],
+         os.path.join(work_dir, f"{task_name.replace(' ', '_')}_{name}.pkl"))
+        for task_name in targets_train
+        for name, model in build_models(n_jobs, tuned.get(task_name), task_name == MULTI_TASK).items()
+    ]
+
+    results = []
+    with ProcessPoolExecutor(max_workers=min(workers, n_pairs)) as pool:
+        futures = [pool.submit(_fit_candidate, job) for job in jobs]
+        for future in as_completed(futures):
+            for row in future.result():
+                print(f"  {row['Task']:<14} {row['Name']:<17} R²={row['R² Score']:<7} fit {row['Fit (s)']}s")
+                results.append(row)
+
+    # Benchmark after the pool has finished so fits don't compete for the CPU
+    print("Benchmarking inference...")
+    benchmarks = {}
+    for row in results:
+        if row["Artifact"] not in benchmarks:
+            model = joblib.load(row["Artifact"])
+            benchmarks[row["Artifact"]] = model_registry.benchmark_inference(model, X_test)
+        row.update(inference_columns(benchmarks[row["Artifact"]]))
+    return pd.DataFrame(results)
+
+INFERENCE_COLUMNS = {
+    "1 row (ms)": lambda b: b["batch_ms"]["1"],
+    "100 rows (ms)": lambda b: b["batch_ms"]["100"],
+    "10k rows (ms)": lambda b: b["batch_ms"]["10000"],
+    "Rows/s": lambda b: b["rows_per_s"],
+    "Size (MB)": lambda b: b["artifact_mb"],
+    "Memory (MB)": lambda b: b["loaded_mb"],
+}
+
+def inference_columns(benchmark):
+    return dict({column: get(benchmark) for column, get in INFERENCE_COLUMNS.items()}, Inference=benchmark)
+
+# Save best models separately
+def train_best_model(results_df, task_name, policy=None):
+    """Pick a model for a task from already-fitted results.
+
+    With no policy this is the highest-R² model. A policy may set
+    latency_slo_ms (single-row predict) and size_budget_mb; the highest-R² model
+    meeting them wins. With accuracy_tolerance (R² a model may give up against
+    the best) as well, the cheapest model to serve (single-row latency, then
+    size) within the tolerance wins instead. If no model meets the limits, the
+    cheapest to serve is chosen with a warning. Returns (name, artifact path,
+    decisions) with the reason each candidate was chosen or rejected.
+    """
+    policy = policy or {}
+    tolerance = policy.get("accuracy_tolerance")
+    slo_ms = policy.get("latency_slo_ms")
+    budget_mb = policy.get("size_budget_mb")
+
+    task_results = results_df[results_df["Task"] == task_name]
+    best_r2 = task_results["R² Score"].max()
+    decisions = []
+    eligible = []
+    for _, row in task_results.iterrows():
+        reasons = []
+        if tolerance is not None and row["R² Score"] < best_r2 - tolerance:
+            reasons.append(f"R² {row['R² Score']} is more than {tolerance} below the best {best_r2}")
+        if slo_ms is not None and row["1 row (ms)"] > slo_ms:
+            reasons.append(f"{row['1 row (ms)']} ms per row exceeds the {slo_ms} ms SLO")
+        if budget_mb is not None and row["Size (MB)"] > budget_mb:
+            reasons.append(f"{row['Size (MB)']} MB exceeds the {budget_mb} MB budget")
+        decisions.append({"model": row["Name"], "r2": float(row["R² Score"]),
+                          "single_row_ms": float(row["1 row (ms)"]), "size_mb": float(row["Size (MB)"]),
+                          "chosen": False, "reason": "; ".join(reasons)})
+        if not reasons:
+            eligible.append(row)
+
+    if eligible and tolerance is not None:
+        chosen = min(eligible, key=lambda row: (row["1 row (ms)"], row["Size (MB)"], -row["R² Score"]))
+        why = "cheapest to serve among models meeting the policy"
+        runner_up = f"meets the policy but costs more to serve than {chosen['Name']}"
+    elif eligible:
+        chosen = max(eligible, key=lambda row: (row["R² Score"], -row["1 row (ms)"]))
+        why = "highest R² among models meeting the policy" if policy else "highest R²"
+        runner_up = f"{'meets the policy but has' if policy else 'has'} a lower R² than {chosen['Name']}"
+    else:
+        # Nothing meets the limits: the cheapest model to serve is the closest to them
+        chosen = min((row for _, row in task_results.iterrows()),
+                     key=lambda row: (row["1 row (ms)"], row["Size (MB)"], -row["R² Score"]))
+        why = "no model meets the policy; falling back to the cheapest to serve"
+        print(f"⚠️ {task_name}: no model meets {policy}; publishing the cheapest to serve, {chosen['Name']} "
+              f"({chosen['1 row (ms)']} ms per row, {chosen['Size (MB)']} MB, R² {chosen['R² Score']}).")
+
+    for decision in decisions:
+        if decision["model"] == chosen["Name"]:
+            decision["chosen"] = True
+            decision["reason"] = f"{why} ({decision['reason']})" if decision["reason"] else why
+        elif not decision["reason"]:
+            decision["reason"] = runner_up
+    return chosen["Name"], chosen["Artifact"], decisions
+
+# ---------- Artifact metadata ----------
+def metadata_path(artifact):
+    return os.path.splitext(artifact)[0] + ".meta.json"
+
+def load_metadata(artifact):
+    path = metadata_path(artifact)
+    if not os.path.exists(path):
+        return None
+    with open(path) as f:
+        return json.load(f)
+
+def save_artifact(model, meta, artifact):
+    """Write model and metadata via temp files + os.replace, so readers never see half a file."""
+    joblib.dump(model, artifact + ".tmp")
+    os.replace(artifact + ".tmp", artifact)
+    with open(metadata_path(artifact) + ".tmp", "w") as f:
+        json.dump(meta, f, indent=2)
+    os.replace(metadata_path(artifact) + ".tmp", metadata_path(artifact))
+
+def publish(registry_name, artifact, model, meta, X_sample, inference=None):
+    """Save the flat artifact and register a new live version that serving processes pick up.
+
+    Tree ensembles are also compiled to flat arrays; the compiled predictor is
+    registered alongside when it matches native predict and is faster per row.
+    """
+    meta["inference"] = inference or model_registry.benchmark_inference(model, X_sample)
+    compiled, error = tree_compiler.compile_verified(model, X_sample)
+    if compiled is not None:
+        compiled_inference = model_registry.benchmark_inference(compiled, X_sample)
+        meta["compiled"] = {"max_abs_error": error, "inference": compiled_inference}
+        if compiled_inference["single_row_ms"] >= meta["inference"]["single_row_ms"]:
+            compiled = None
+    save_artifact(model, meta, artifact)
+    version = model_registry.register(registry_name, model, meta, compiled=compiled)
+    if registry_name != MULTI_REGISTRY_NAME:
+        # Serving prefers a live multi-output model; separately trained ones replace it
+        model_registry.retire(MULTI_REGISTRY_NAME)
+    return version
+
+def high_water_mark(df):
+    return {"vital_id": int(df["vital_id"].max()), "risk_id": int(df["risk_id"].max())}
+
+def normal_equations(X, y):
+    """X'X and X'y with an intercept column: enough to refit a LinearRegression exactly."""
+    Xa = np.hstack([np.asarray(X, dtype=np.float64), np.ones((len(X), 1))])
+    ya = np.asarray(y, dtype=np.float64)
+    return Xa.T @ Xa, Xa.T @ ya
+
+def build_metadata(task_name, name, X_train, y_train, metrics, hwm):
+    xtx, xty = normal_equations(X_train, y_train)
     return {
-        "Task": task_name,
-        "Model": type(model).__name__,
-        "R² Score": round(r2, 4),
-        "RMSE": round(rmse, 4)
+        "task": task_name,
+        "model": name,
+        "target": list(TARGETS.values()) if task_name == MULTI_TASK else TARGETS[task_name],
+        "features": FEATURES,
+        "trained_at": datetime.now().isoformat(),
+        "high_water_mark": hwm,
+        "n_rows": int(len(X_train)),
+        "rows_since_full_build": 0,
+        "metrics": metrics,
+        "feature_mean": np.asarray(X_train, dtype=np.float64).mean(axis=0).tolist(),
+        "feature_std": np.asarray(X_train, dtype=np.float64).std(axis=0).tolist(),
+        "normal_equations": {"xtx": xtx.tolist(), "xty": xty.tolist()},
     }
 
-# Step 5: Train & collect results
-for task_name, (y_train, y_test) in {"Heart Disease": (y_train_heart, y_test_heart), "Diabetes": (y_train_diabetes, y_test_diabetes)}.items():
-    for name, model in models.items():
-        metrics = evaluate_model(model, X_train, X_test, y_train, y_test, task_name)
-        results.append(metrics)
+def multi_output_results(results_df):
+    """One selection row per multi-output model: mean R²/RMSE over the targets it predicts."""
+    combined = results_df.groupby("Name", as_index=False).agg(
+        {"Model": "first", "R² Score": "mean", "RMSE": "mean", "Artifact": "first", "Inference": "first",
+         **{column: "first" for column in INFERENCE_COLUMNS}})
+    return combined.assign(Task=MULTI_TASK, **{"R² Score": combined["R² Score"].round(4),
+                                               "RMSE": combined["RMSE"].round(4)})
 
-# Convert results to DataFrame
-results_df = pd.DataFrame(results)
+def main(workers=None, params_path=None, db_path="healthcare.db", cache_dir=FEATURE_CACHE_DIR, policy=None,
+         multi_output=False):
+    tuned = None
+    if params_path:
+        with open(params_path) as f:
+            tuned = json.load(f)
+        print(f"Using tuned parameters from '{params_path}'.")
+        if multi_output and MULTI_TASK not in tuned:
+            # hyperparameter_search.py tunes each task separately; no entry fits a model of both
+            print(f"⚠️ '{params_path}' only has per-task parameters; multi-output models use their defaults.")
 
-# Save best models separately
-def train_best_model(X_train, X_test, y_train, y_test, label):
-    best_r2 = -np.inf
-    best_model = None
-    best_model_name = None
-    for name, model in models.items():
-        model.fit(X_train, y_train)
-        preds = model.predict(X_test)
-        r2 = r2_score(y_test, preds)
-        if r2 > best_r2:
-            best_r2 = r2
-            best_model = model
-            best_model_name = name
-    return best_model_name, best_model
-
-heart_model_name, heart_model = train_best_model(X_train, X_test, y_train_heart, y_test_heart, "Heart Disease")
-diabetes_model_name, diabetes_model = train_best_model(X_train, X_test, y_train_diabetes, y_test_diabetes, "Diabetes")
-
-joblib.dump(heart_model, "heart_risk_model.pkl")
-joblib.dump(diabetes_model, "diabetes_risk_model.pkl")
-
-print("\n📊 Detailed Model Evaluation Results:")
-print(results_df.sort_values(by=["Task", "R² Score"], ascending=[True, False]))
-
-print(f"\n✅ Best Heart Model: {heart_model_name} → Saved as 'heart_risk_model.pkl'")
-print(f"✅ Best Diabetes Model: {diabetes_model_name} → Saved as 'diabetes_risk_model.pkl'")
-print("✅ Models trained and saved successfully.")
\ No newline at end of file
+    started = time.perf_counter()
+    df = load_training_data(db_path, cache_dir=cache_dir)
+    loaded = time.perf_counter()
+
+    X = df[FEATURES]
+    y = df[list(TARGETS.values())]
+
+    X_train, X_test, y_train, y_test = train_test_split(X, y, test_size=0.2, random_state=42)
+    if multi_output:
+        targets_train, targets_test = {MULTI_TASK: y_train}, {MULTI_TASK: y_test}
+        outputs = {MULTI_TASK: (MULTI_REGISTRY_NAME, MULTI_ARTIFACT)}
+    else:
+        targets_train = {task: y_train[column] for task, column in TARGETS.items()}
+        targets_test = {task: y_test[column] for task, column in TARGETS.items()}
+        outputs = {task: (REGISTRY_NAMES[task], artifact) for task, artifact in ARTIFACTS.items()}
+
+    # Step 5: Train & collect results (each model is fitted once, in parallel)
+    work_dir = tempfile.mkdtemp(prefix="risk_models_", dir=".")
+    best = {}
+    selections = {}
+    try:
+        results_df = evaluate_models(X_train, X_test, targets_train, targets_test, work_dir, workers, tuned)
+        trained = time.perf_counter()
+
+        selection_df = multi_output_results(results_df) if multi_output else results_df
+        for task_name, (registry_name, artifact) in outputs.items():
+            name, path, decisions = train_best_model(selection_df, task_name, policy)
+            selections[task_name] = decisions
+            row = selection_df[(selection_df["Task"] == task_name) & (selection_df["Name"] == name)].iloc[0]
+            meta = build_metadata(task_name, name, X_train, targets_train[task_name],
+                                  {"r2": float(row["R² Score"]), "rmse": float(row["RMSE"])}, high_water_mark(df))
+            meta["selection"] = {"policy": policy or {}, "decisions": decisions}
+            version = publish(registry_name, artifact, joblib.load(path), meta, X_test, row["Inference"])
+            best[task_name] = (f"{name} ({registry_name} {version})", artifact)
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+    print("\n📊 Detailed Model Evaluation Results:")
+    print(results_df.drop(columns=["Name", "Artifact", "Inference"])
+          .sort_values(by=["Task", "R² Score"], ascending=[True, False]).to_string())
+
+    print("\n🧭 Model Selection:")
+    for task_name, decisions in selections.items():
+        for decision in decisions:
+            mark = "✅" if decision["chosen"] else "  "
+            print(f"  {mark} {task_name:<24} {decision['model']:<17} {decision['reason']}")
+
+    # A multi-output model reports one row per target but was fitted once
+    fits = results_df.drop_duplicates("Artifact")
+    serial_s = fits["Fit (s)"].sum() + fits["Predict (s)"].sum()
+    print("\n⏱️ Wall-clock breakdown:")
+    print(f"  Data load:            {loaded - started:.1f}s")
+    print(f"  Fit + evaluate:       {trained - loaded:.1f}s wall ({serial_s:.1f}s of model time)")
+    print(f"  Total:                {time.perf_counter() - started:.1f}s")
+
+    print()
+    for task_name, (description, artifact) in best.items():
+        print(f"✅ Best {task_name} Model: {description} → Saved as '{artifact}'")
+    print("✅ Models trained and saved successfully.")
+
+# ---------- Incremental retraining ----------
+def drift_reasons(meta, X_new, y_new, model, max_new_fraction, drift_threshold, r2_tolerance):
+    """Reasons the new rows call for a full rebuild (empty list = safe to update in place)."""
+    reasons = []
+    n_new = len(X_new)
+    if meta["rows_since_full_build"] + n_new > max_new_fraction * meta["n_rows"]:
+        reasons.append(f"{meta['rows_since_full_build'] + n_new} rows since the last full build "
+                       f"exceed {max_new_fraction:.0%} of {meta['n_rows']}")
+
+    mean = np.asarray(meta["feature_mean"])
+    std = np.maximum(np.asarray(meta["feature_std"]), 1e-9)
+    shift = np.abs(np.asarray(X_new, dtype=np.float64).mean(axis=0) - mean) / std
+    for feature, value in zip(FEATURES, shift):
+        if value > drift_threshold:
+            reasons.append(f"{feature} mean shifted by {value:.2f} std")
+
+    # Score the current model on rows it has never seen before updating it
+    if n_new > 1:
+        r2_new = r2_score(y_new, model.predict(X_new))
+        if r2_new < meta["metrics"]["r2"] - r2_tolerance:
+            reasons.append(f"R² on new rows {r2_new:.4f} vs {meta['metrics']['r2']:.4f} at build time")
+    return reasons
+
+def update_model(model, meta, X_new, y_new):
+    """Extend a fitted model with new rows only. Returns (model, description)."""
+    growth = len(X_new) / max(meta["n_rows"], 1)
+
+    if isinstance(model, XGBRegressor):
+        rounds = max(5, int(np.ceil(model.get_booster().num_boosted_rounds() * growth)))
+        model.set_params(n_estimators=rounds)
+        model.fit(X_new, y_new, xgb_model=model.get_booster())
+        return model, f"+{rounds} boosting rounds"
+
+    if isinstance(model, (RandomForestRegressor, GradientBoostingRegressor)):
+        extra = max(5, int(np.ceil(model.n_estimators * growth)))
+        model.set_params(warm_start=True, n_estimators=model.n_estimators + extra)
+        model.fit(X_new, y_new)
+        return model, f"+{extra} {'trees' if isinstance(model, RandomForestRegressor) else 'stages'} (warm start)"
+
+    if isinstance(model, LinearRegression):
+        # Accumulate the normal equations, which gives exactly the full-data least-squares fit
+        xtx, xty = normal_equations(X_new, y_new)
+        xtx += np.asarray(meta["normal_equations"]["xtx"])
+        xty += np.asarray(meta["normal_equations"]["xty"])
+        solution = np.linalg.lstsq(xtx, xty, rcond=None)[0]
+        model.coef_ = solution[:-1]
+        model.intercept_ = solution[-1]
+        meta["normal_equations"] = {"xtx": xtx.tolist(), "xty": xty.tolist()}
+        return model, "normal equations updated (exact refit)"
+
+    if hasattr(model, "partial_fit"):
+        model.partial_fit(X_new, y_new)
+        return model, "partial_fit on new rows"
+
+    return None, f"{type(model).__name__} cannot be updated incrementally"
+
+def incremental_update(db_path="healthcare.db", workers=None, params_path=None,
+                       max_new_fraction=0.5, drift_threshold=0.5, r2_tolerance=0.05, min_new_rows=1, policy=None,
+                       multi_output=False):
+    """Train on rows past the saved high-water mark, or fall back to a full rebuild."""
+    if multi_output:
+        print("Multi-output models are always rebuilt in full.")
+        return main(workers, params_path, db_path, policy=policy, multi_output=True)
+    metas = {task: load_metadata(artifact) for task, artifact in ARTIFACTS.items()}
+    if any(meta is None for meta in metas.values()):
+        print("No model metadata found; running a full build.")
+        return main(workers, params_path, db_path, policy=policy)
+
+    since = {
+        "vital_id": min(meta["high_water_mark"]["vital_id"] for meta in metas.values()),
+        "risk_id": min(meta["high_water_mark"]["risk_id"] for meta in metas.values()),
+    }
+    new_df = load_training_data(db_path, since=since)
+    if len(new_df) == 0 or len(new_df) < min_new_rows:
+        print(f"✅ No new visits since vital_id {since['vital_id']} / risk_id {since['risk_id']}; models unchanged.")
+        return
+
+    X_new = new_df[FEATURES]
+    updates = {}
+    for task_name, artifact in ARTIFACTS.items():
+        meta = metas[task_name]
+        model = joblib.load(artifact)
+        y_new = new_df[TARGETS[task_name]]
+        reasons = drift_reasons(meta, X_new, y_new, model, max_new_fraction, drift_threshold, r2_tolerance)
+        if not reasons:
+            started = time.perf_counter()
+            model, description = update_model(model, meta, X_new, y_new)
+            if model is None:
+                reasons.append(description)
+            else:
+                updates[task_name] = (model, description, time.perf_counter() - started)
+        if reasons:
+            print(f"🔁 {task_name}: full rebuild needed — " + "; ".join(reasons))
+            return main(workers, params_path, db_path, policy=policy)
+
+    for task_name, (model, description, seconds) in updates.items():
+        meta = metas[task_name]
+        meta["high_water_mark"] = high_water_mark(new_df)
+        meta["rows_since_full_build"] += len(new_df)
+        meta["n_rows"] += len(new_df)
+        meta["trained_at"] = datetime.now().isoformat()
+        version = publish(REGISTRY_NAMES[task_name], ARTIFACTS[task_name], model, meta, X_new)
+        print(f"✅ {task_name} ({meta['model']}): {description} from {len(new_df)} new rows in {seconds:.2f}s "
+              f"→ {REGISTRY_NAMES[task_name]} {version}")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Train the heart and diabetes risk models.")
+    parser.add_argument("--workers", type=int, default=None, help="parallel model fits (default: all cores)")
+    parser.add_argument("--params", default=None, help="tuned parameters written by hyperparameter_search.py")
+    parser.add_argument("--db", default="healthcare.db")
+    parser.add_argument("--no-cache", action="store_true", help="always rebuild the feature matrix from SQLite")
+    parser.add_argument("--accuracy-tolerance", type=float, default=None,
+                        help="accept models whose R² is within this of the best and pick the cheapest")
+    parser.add_argument("--latency-slo-ms", type=float, default=None, help="max single-row predict latency")
+    parser.add_argument("--size-budget-mb", type=float, default=None, help="max serialized model size")
+    parser.add_argument("--multi-output", action="store_true",
+                        help="train one model that predicts both heart and diabetes risk")
+    parser.add_argument("--incremental", action="store_true",
+                        help="update the saved models with rows added since they were built")
+    parser.add_argument("--max-new-fraction", type=float, default=0.5,
+                        help="rebuild once new rows exceed this share of the training rows")
+    parser.add_argument("--drift-threshold", type=float, default=0.5,
+                        help="rebuild when a feature mean moves by more than this many std")
+    parser.add_argument("--r2-tolerance", type=float, default=0.05,
+                        help="rebuild when R² on new rows drops by more than this")
+    args = parser.parse_args()
+
+    policy = {key: value for key, value in (("accuracy_tolerance", args.accuracy_tolerance),
+                                            ("latency_slo_ms", args.latency_slo_ms),
+                                            ("size_budget_mb", args.size_budget_mb)) if value is not None}
+    if args.incremental:
+        incremental_update(args.db, args.workers, args.params,
+                           args.max_new_fraction, args.drift_threshold, args.r2_tolerance,
+                           policy=policy, multi_output=args.multi_output)
+    else:
+        main(args.workers, args.params, args.db, None if args.no_cache else FEATURE_CACHE_DIR, policy,
+             args.multi_output)
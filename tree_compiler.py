@@ -0,0 +1,246 @@
+# tree_compiler.py
+
+import argparse
+import json
+import time
+
+import joblib
+import numpy as np
+import pandas as pd
+from sklearn.ensemble import RandomForestRegressor, GradientBoostingRegressor
+from sklearn.multioutput import MultiOutputRegressor
+from xgboost import XGBRegressor
+
+# Rows x trees traversed per step; bounds the size of the index/gather temporaries
+CHUNK_CELLS = 1 << 18
+
+# ---------- Compiled predictor ----------
+class CompiledTreeEnsemble:
+    """A tree ensemble flattened into NumPy arrays and evaluated by vectorized traversal.
+
+    Node arrays are concatenated over all trees and roots[t] is the first node of
+    tree t; children[2 * node + went_right] is the next node. Leaves point back to
+    themselves, so a row that has arrived simply stays put while the others finish.
+    The prediction is init + sum over trees of weights[t] * value[leaf]. All state
+    is plain arrays, so joblib.load(..., mmap_mode="r") maps them instead of copying.
+    """
+
+    def __init__(self, feature, threshold, children, is_leaf, missing_left, value, roots, weights, init,
+                 max_depth, strict, feature_names, source):
+        self.feature = feature
+        self.threshold = threshold
+        self.children = children
+        self.is_leaf = is_leaf
+        self.missing_left = missing_left
+        self.value = value
+        self.roots = roots
+        self.weights = weights
+        self.init = init
+        self.max_depth = max_depth
+        self.strict = strict  # XGBoost goes left on x < split, scikit-learn on x <= split
+        self.feature_names = feature_names
+        self.source = source
+
+    @property
+    def n_outputs(self):
+        return self.value.shape[1]
+
+    def _leaves(self, X):
+        n_rows, n_features = X.shape
+        flat = X.ravel()
+        row_offsets = (np.arange(n_rows, dtype=np.int64) * n_features)[:, None]
+        idx = np.repeat(self.roots[None, :], n_rows, axis=0)
+        has_missing = np.isnan(flat).any()
+        for step in range(self.max_depth):
+            x = flat[row_offsets + self.feature[idx]]
+            threshold = self.threshold[idx]
+            go_right = x >= threshold if self.strict else x > threshold
+            if has_missing:
+                go_right = np.where(np.isnan(x), ~self.missing_left[idx], go_right)
+            idx = self.children[2 * idx + go_right]
+            # Shallow branches finish early; stop once every row sits on a leaf
+            if step % 4 == 3 and self.is_leaf[idx].all():
+                break
+        return idx
+
+    def predict(self, X):
+        if isinstance(X, pd.DataFrame) and self.feature_names is not None:
+            X = X[self.feature_names]
+        # Both libraries compare float32 inputs against their thresholds
+        X = np.asarray(X, dtype=np.float32).astype(np.float64)
+        out = np.empty((len(X), self.n_outputs))
+        step = max(1, CHUNK_CELLS // len(self.roots))
+        for start in range(0, len(X), step):
+            leaves = self._leaves(X[start:start + step])
+            out[start:start + step] = self.init + np.einsum("t,ntk->nk", self.weights, self.value[leaves])
+        return out[:, 0] if self.n_outputs == 1 else out
+
+# ---------- Extraction ----------
+def _sklearn_tree(estimator, weight):
+    tree = estimator.tree_
+    return {
+        "feature": tree.feature,
+        "threshold": tree.threshold,
+        "left": tree.children_left,
+        "right": tree.children_right,
+        "missing_left": np.asarray(tree.missing_go_to_left, dtype=bool),
+        "value": tree.value[:, :, 0],
+        "weight": weight,
+    }
+
+def _xgboost_trees(model):
+    learner = json.loads(model.get_booster().save_raw("json"))["learner"]
+    if learner["gradient_booster"]["name"] != "gbtree" or learner["objective"]["name"] != "reg:squarederror":
+        raise ValueError("only gbtree boosters with reg:squarederror can be compiled")
+    n_targets = int(learner["learner_model_param"].get("num_target", "1"))
+    init = np.array(learner["learner_model_param"]["base_score"].strip("[]").split(","), dtype=np.float64)
+    booster = learner["gradient_booster"]["model"]
+
+    trees = []
+    for tree, target in zip(booster["trees"], booster["tree_info"]):
+        left = np.array(tree["left_children"], dtype=np.int64)
+        leaf = left == -1
+        size_leaf_vector = int(tree["tree_param"]["size_leaf_vector"])
+        value = np.zeros((len(left), n_targets))
+        if size_leaf_vector > 1:
+            # Vector leaves: right_children holds the leaf's slot in leaf_weights
+            leaf_weights = np.array(tree["leaf_weights"], dtype=np.float64).reshape(-1, size_leaf_vector)
+            value[leaf] = leaf_weights[np.array(tree["right_children"])[leaf]]
+        else:
+            value[leaf, target] = np.array(tree["split_conditions"], dtype=np.float64)[leaf]
+        trees.append({
+            "feature": np.array(tree["split_indices"], dtype=np.int64),
+            "threshold": np.array(tree["split_conditions"], dtype=np.float32).astype(np.float64),
+            "left": left,
+            "right": np.where(leaf, -1, np.array(tree["right_children"], dtype=np.int64)),
+            "missing_left": np.array(tree["default_left"], dtype=bool),
+            "value": value,
+            "weight": 1.0,
+        })
+    return trees, np.broadcast_to(init, (n_targets,)).copy(), True
+
+def _extract(model):
+    """(trees, init, strict) for a supported fitted model."""
+    if isinstance(model, RandomForestRegressor):
+        trees = [_sklearn_tree(e, 1.0 / len(model.estimators_)) for e in model.estimators_]
+        return trees, np.zeros(model.n_outputs_), False
+    if isinstance(model, GradientBoostingRegressor):
+        if model.loss != "squared_error":
+            raise ValueError("only squared_error GradientBoosting can be compiled")
+        init = np.zeros(1) if model.init_ == "zero" else np.asarray(model.init_.constant_, dtype=np.float64).ravel()
+        return [_sklearn_tree(e, model.learning_rate) for e in model.estimators_[:, 0]], init, False
+    if isinstance(model, XGBRegressor):
+        return _xgboost_trees(model)
+    if isinstance(model, MultiOutputRegressor):
+        # One ensemble per target: widen each tree's values to all targets
+        parts = [_extract(e) for e in model.estimators_]
+        if len({strict for _, _, strict in parts}) > 1:
+            raise ValueError("mixed split conventions cannot share one compiled model")
+        trees, init = [], []
+        for j, (part_trees, part_init, _) in enumerate(parts):
+            for tree in part_trees:
+                value = np.zeros((len(tree["value"]), len(parts)))
+                value[:, j] = tree["value"][:, 0]
+                trees.append(dict(tree, value=value))
+            init.append(part_init[0])
+        return trees, np.array(init), parts[0][2]
+    raise ValueError(f"{type(model).__name__} is not a supported tree ensemble")
+
+def _depth(left, right):
+    # Both libraries number children after their parent, so one forward pass suffices
+    depth = np.zeros(len(left), dtype=np.int64)
+    for node in range(len(left)):
+        if left[node] != -1:
+            depth[left[node]] = depth[right[node]] = depth[node] + 1
+    return int(depth.max())
+
+# ---------- Compilation ----------
+def compile_model(model):
+    """Flatten a fitted RandomForest, GradientBoosting, XGBoost or MultiOutputRegressor
+    of those into a CompiledTreeEnsemble. Raises ValueError for anything else."""
+    trees, init, strict = _extract(model)
+    sizes = np.array([len(tree["left"]) for tree in trees])
+    offsets = np.concatenate([[0], np.cumsum(sizes)[:-1]])
+
+    feature, threshold, children, is_leaf = [], [], [], []
+    for tree, offset in zip(trees, offsets):
+        nodes = np.arange(len(tree["left"])) + offset
+        leaf = tree["left"] == -1
+        feature.append(np.where(leaf, 0, tree["feature"]))
+        threshold.append(np.where(leaf, np.inf, tree["threshold"]))
+        children.append(np.column_stack([np.where(leaf, nodes, tree["left"] + offset),
+                                         np.where(leaf, nodes, tree["right"] + offset)]).ravel())
+        is_leaf.append(leaf)
+
+    feature_names = getattr(model, "feature_names_in_", None)
+    return CompiledTreeEnsemble(
+        feature=np.concatenate(feature).astype(np.int32),
+        threshold=np.concatenate(threshold).astype(np.float64),
+        children=np.concatenate(children).astype(np.int64),
+        is_leaf=np.concatenate(is_leaf),
+        missing_left=np.concatenate([tree["missing_left"] for tree in trees]),
+        value=np.concatenate([tree["value"] for tree in trees]).astype(np.float64),
+        roots=offsets.astype(np.int32),
+        weights=np.array([tree["weight"] for tree in trees], dtype=np.float64),
+        init=init,
+        max_depth=max(_depth(tree["left"], tree["right"]) for tree in trees),
+        strict=strict,
+        feature_names=list(feature_names) if feature_names is not None else None,
+        source=type(model).__name__,
+    )
+
+def max_abs_error(model, compiled, X):
+    return float(np.max(np.abs(np.asarray(model.predict(X)) - compiled.predict(X))))
+
+def compile_verified(model, X, tolerance=1e-5):
+    """compile_model plus a check against native predict on X. Returns (compiled, error);
+    compiled is None if the model can't be compiled or disagrees beyond tolerance."""
+    try:
+        compiled = compile_model(model)
+    except ValueError:
+        return None, None
+    error = max_abs_error(model, compiled, X)
+    return (compiled if error <= tolerance else None), error
+
+# ---------- Benchmark ----------
+def benchmark(model, compiled, X, batch_sizes=(1, 10, 100, 1_000, 10_000, 100_000), min_time=0.2):
+    rows = []
+    for size in batch_sizes:
+        batch = X.iloc[np.arange(size) % len(X)]
+        row = {"Batch": size}
+        for label, predictor in (("Native", model), ("Compiled", compiled)):
+            predictor.predict(batch)
+            timings = []
+            while len(timings) < 3 or (sum(timings) < min_time and len(timings) < 50):
+                started = time.perf_counter()
+                predictor.predict(batch)
+                timings.append(time.perf_counter() - started)
+            row[f"{label} (ms)"] = round(float(np.median(timings)) * 1000, 3)
+        row["Speedup"] = round(row["Native (ms)"] / row["Compiled (ms)"], 2)
+        rows.append(row)
+    return pd.DataFrame(rows)
+
+if __name__ == "__main__":
+    from train_predictive_model import load_training_data
+    from risk_scoring import FEATURES
+
+    parser = argparse.ArgumentParser(description="Compile a saved tree model and compare it with native predict.")
+    parser.add_argument("artifact", nargs="?", default="heart_risk_model.pkl")
+    parser.add_argument("--db", default="healthcare.db")
+    parser.add_argument("--output", help="save the compiled predictor here (joblib, mmap-friendly)")
+    args = parser.parse_args()
+
+    model = joblib.load(args.artifact)
+    X = load_training_data(args.db)[FEATURES]
+    started = time.perf_counter()
+    compiled = compile_model(model)
+    print(f"✅ Compiled {compiled.source}: {len(compiled.roots)} trees, {len(compiled.is_leaf)} nodes, "
+          f"depth {compiled.max_depth} in {(time.perf_counter() - started) * 1000:.0f} ms")
+    print(f"Max |native - compiled| over {len(X)} rows: {max_abs_error(model, compiled, X):.2e}")
+
+    print("\n⏱️ Predict latency by batch size:")
+    print(benchmark(model, compiled, X).to_string(index=False))
+
+    if args.output:
+        joblib.dump(compiled, args.output)
+        print(f"\n✅ Saved compiled predictor to '{args.output}'")